@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# Latency benchmark for the bot's hot functions and a full turn, on synthetic states for
+# every map size in sizeratio2, 2 and 4 players and fleets of 10 to 250 ships (the fleet
+# is split evenly between the players). Prints p50/p99 in ms per case and exits non-zero
+# when a full turn's p99 passes --turn-limit or any p99 regresses past --baseline.
+#
+#   python3 Benchmark.py --save baseline.json
+#   python3 Benchmark.py --baseline baseline.json
+#   python3 Benchmark.py --sizes 32 64 --ships 250 --bot old/MyBot.py
+
+import hlt
+from hlt import constants
+
+import sys
+import json
+import random
+import time
+import argparse
+
+import LocalEngine
+
+fleet_sizes = [10, 50, 100, 250]
+hot_functions = ['GetHaliteRichness', 'GetRichestPosition', 'GetRichestPositionWide', 'GetRichestPositionScan', 'GetNextMove', 'ConvertToDropoff', 'GetClosestStoragePosition']
+
+def BuildState(bot_path, size, num_players, num_ships, seed):
+    # a mid-game position: ships and one dropoff per player scattered around their yard, halite in the bank
+    constants.load_constants(dict(LocalEngine.default_constants, MAX_TURNS=LocalEngine.max_turns_by_size[size]))
+    rng = random.Random(seed)
+    random.seed(seed)
+    engine = LocalEngine.localEngine(size, num_players, seed)
+    engine.turn_number = engine.max_turns // 4
+    engine.bank = [rng.randint(2000, 20000) for _ in range(num_players)]
+    taken = set(engine.yards)
+    for pid in range(num_players):
+        yard = engine.yards[pid]
+        spread = size // 4
+        placed = 0
+        while placed <= num_ships // num_players:
+            pos = ((yard[0] + rng.randint(-spread, spread)) % size, (yard[1] + rng.randint(-spread, spread)) % size)
+            if pos in taken:
+                continue
+            #
+            taken.add(pos)
+            if placed == 0:
+                engine.dropoffs[engine.next_id] = [pid, pos[0], pos[1]]
+                engine.halite[pos[1]][pos[0]] = 0
+            else:
+                engine.ships[engine.next_id] = [pid, pos[0], pos[1], rng.randint(0, constants.MAX_HALITE)]
+            #
+            engine.next_id += 1
+            placed += 1
+        #
+    #
+    engine.changed = set()
+
+    bot = LocalEngine.LoadBot(bot_path)
+    bot.tiebreak.seed(seed)
+    bot.turn_budget = 1000.0
+    game = LocalEngine.localGame(engine, 0)
+    bot.Initialize(game)
+    game.ready(bot.__name__)
+    game.update_frame()
+    bot.UpdateGridSnapshot(game)
+    bot.UpdateStorageField(game.me, game.game_map)
+    bot.RollNavPlan(game.turn_number)
+    for ship in game.me.get_ships():
+        record = bot.shipRecord(bot.shipState.EXPLORING, ship.position)
+        record.goal = game.game_map.normalize(hlt.Position(ship.position.x + rng.randint(-8, 8), ship.position.y + rng.randint(-8, 8)))
+        bot.ship_status[ship.id] = record
+    #
+    return bot, engine, game
+#
+
+def TimeCalls(fn, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    #
+    return samples
+#
+
+def RunCase(bot_path, size, num_players, num_ships, seed, repeat, turns):
+    bot, engine, game = BuildState(bot_path, size, num_players, num_ships, seed)
+    me = game.me
+    game_map = game.game_map
+    ships = me.get_ships()
+    rng = random.Random(seed)
+    positions = [hlt.Position(rng.randrange(size), rng.randrange(size)) for _ in range(repeat)]
+    picks = [ships[rng.randrange(len(ships))] for _ in range(repeat)] if ships else []
+    storage_dist = sum(bot.GetStorageDistance(ship.position, game_map) for ship in ships) / max(1, len(ships))
+
+    def ConvertOnce(ship):
+        # ConvertToDropoff books a planned dropoff on success; forget it so every call does the full check
+        bot.ConvertToDropoff(ship, me, storage_dist, game_map)
+        bot.planned_dropoffs.clear()
+    #
+
+    samples = {}
+    samples['GetHaliteRichness'] = TimeCalls(bot.GetHaliteRichness, [(pos, rng.randint(1, 4), game_map) for pos in positions])
+    samples['GetRichestPosition'] = TimeCalls(bot.GetRichestPosition, [(pos, rng.randint(0, 3), rng.random() < 0.5, rng.random() < 0.5, game_map) for pos in positions])
+    # searches wider than richest_scan_radius go through the tile maxima; the same calls with the
+    # threshold raised past them time the plain ring scan they replace
+    scan_radius = getattr(bot, 'richest_scan_radius', 4)
+    wide_args = [(pos, rng.randint(scan_radius, min(scan_radius + 8, size // 2 - 2)), rng.random() < 0.5, rng.random() < 0.5, game_map) for pos in positions]
+    samples['GetRichestPositionWide'] = TimeCalls(bot.GetRichestPosition, wide_args)
+    bot.richest_scan_radius = size
+    samples['GetRichestPositionScan'] = TimeCalls(bot.GetRichestPosition, wide_args)
+    bot.richest_scan_radius = scan_radius
+    samples['GetNextMove'] = TimeCalls(bot.GetNextMove, [(ship, game_map, me) for ship in picks])
+    samples['ConvertToDropoff'] = TimeCalls(ConvertOnce, [(ship,) for ship in picks])
+    samples['GetClosestStoragePosition'] = TimeCalls(bot.GetClosestStoragePosition, [(pos, me, game_map) for pos in positions])
+
+    # full turns are played forward from the synthetic state, so they include the engine's frame update
+    turn_samples = []
+    for _ in range(turns):
+        engine.turn_number += 1
+        started = time.perf_counter()
+        bot.PlayTurn(game)
+        turn_samples.append(time.perf_counter() - started)
+        engine.ApplyCommands([game.commands] + [[] for _ in range(num_players - 1)])
+    #
+    samples['PlayTurn'] = turn_samples
+    return samples
+#
+
+def Summarize(samples):
+    return [round(LocalEngine.Percentile(samples, 0.5) * 1000, 4), round(LocalEngine.Percentile(samples, 0.99) * 1000, 4)]
+#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the bot's hot functions across map sizes, player counts and fleet sizes.")
+    parser.add_argument('--bot', default='MyBot.py')
+    parser.add_argument('--sizes', type=int, nargs='+', default=sorted(LocalEngine.max_turns_by_size))
+    parser.add_argument('--players', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--ships', type=int, nargs='+', default=fleet_sizes)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=200, help="calls per hot function per case")
+    parser.add_argument('--turns', type=int, default=20, help="full turns per case")
+    parser.add_argument('--turn-limit', type=float, default=1500.0, help="fail if a full turn's p99 passes this many ms")
+    parser.add_argument('--baseline', help="fail if any p99 is slower than this saved run by more than --tolerance")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--floor', type=float, default=0.05, help="ignore regressions on p99s below this many ms")
+    parser.add_argument('--save', help="write the results here as a baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        #
+    #
+    results = {}
+    failures = []
+    print("{:<14} {:<26} {:>10} {:>10}".format('case', 'function', 'p50 ms', 'p99 ms'))
+    for size in args.sizes:
+        for num_players in args.players:
+            for num_ships in args.ships:
+                case = "{}x{}p{}s".format(size, num_players, num_ships)
+                samples = RunCase(args.bot, size, num_players, num_ships, args.seed, args.repeat, args.turns)
+                for name in hot_functions + ['PlayTurn']:
+                    if not samples[name]:
+                        continue
+                    #
+                    key = "{}/{}".format(case, name)
+                    p50, p99 = Summarize(samples[name])
+                    results[key] = [p50, p99]
+                    flag = ''
+                    if name == 'PlayTurn' and p99 > args.turn_limit:
+                        flag = 'OVER LIMIT'
+                    elif key in baseline and p99 > args.floor and p99 > baseline[key][1] * (1 + args.tolerance):
+                        flag = 'REGRESSED from {:.4f}'.format(baseline[key][1])
+                    #
+                    if flag:
+                        failures.append(key)
+                    #
+                    print("{:<14} {:<26} {:>10.4f} {:>10.4f} {}".format(case, name, p50, p99, flag))
+                #
+            #
+        #
+    #
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        #
+    #
+    if failures:
+        print("{} case(s) failed: {}".format(len(failures), ", ".join(failures)))
+        sys.exit(1)
+    #
+#
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+
+# In-process Halite III rules engine. Runs bots that expose Initialize(game) and
+# PlayTurn(game) against a seeded map with no engine binary or stdin/stdout pipe,
+# so the same seed can be replayed quickly (and under cProfile) across bot versions.
+#
+#   python3 LocalEngine.py MyBot.py old/MyBot.py --size 32 --seed 7
+#   python3 LocalEngine.py MyBot.py --players 4 --seeds 20
+#   python3 LocalEngine.py MyBot.py --seeds 20 --sync-planner
+#   python3 LocalEngine.py MyBot.py MyBot.py --profile
+
+import hlt
+from hlt import constants
+from hlt.game_map import Player, GameMap, MapCell
+from hlt.entity import Ship, Shipyard, Dropoff
+
+import random
+import time
+import argparse
+import importlib.util
+
+default_constants = {
+    'NEW_ENTITY_ENERGY_COST': 1000,
+    'DROPOFF_COST': 4000,
+    'MAX_ENERGY': 1000,
+    'MAX_TURNS': 400,
+    'EXTRACT_RATIO': 4,
+    'MOVE_COST_RATIO': 10,
+    'INSPIRATION_ENABLED': True,
+    'INSPIRATION_RADIUS': 4,
+    'INSPIRATION_SHIP_COUNT': 2,
+    'INSPIRED_EXTRACT_RATIO': 4,
+    'INSPIRED_BONUS_MULTIPLIER': 2.0,
+    'INSPIRED_MOVE_COST_RATIO': 10
+}
+max_turns_by_size = {32: 400, 40: 425, 48: 450, 56: 475, 64: 500}
+starting_halite = 5000
+move_offsets = {'n': (0, -1), 's': (0, 1), 'e': (1, 0), 'w': (-1, 0), 'o': (0, 0)}
+
+bot_count = 0
+
+class localGame:
+    # the slice of hlt.Game the bot touches, filled from the engine instead of stdin
+
+    def __init__(self, engine, player_id):
+        self.engine = engine
+        self.my_id = player_id
+        self.turn_number = 0
+        self.players = {}
+        for pid in range(engine.num_players):
+            yard = engine.yards[pid]
+            self.players[pid] = Player(pid, Shipyard(pid, -1, hlt.Position(yard[0], yard[1])))
+        #
+        self.me = self.players[player_id]
+        cells = [[MapCell(hlt.Position(x, y), engine.halite[y][x]) for x in range(engine.size)] for y in range(engine.size)]
+        self.game_map = GameMap(cells, engine.size, engine.size)
+        self.commands = None
+    #
+
+    def ready(self, name):
+        self.name = name
+    #
+
+    def update_frame(self):
+        engine = self.engine
+        self.turn_number = engine.turn_number
+        for pid, player in self.players.items():
+            player.halite_amount = engine.bank[pid]
+            player._ships = {}
+            player._dropoffs = {}
+        #
+        for sid, s in engine.ships.items():
+            self.players[s[0]]._ships[sid] = Ship(s[0], sid, hlt.Position(s[1], s[2]), s[3])
+        #
+        for did, d in engine.dropoffs.items():
+            self.players[d[0]]._dropoffs[did] = Dropoff(d[0], did, hlt.Position(d[1], d[2]))
+        #
+        cells = self.game_map._cells
+        for row in cells:
+            for cell in row:
+                cell.ship = None
+            #
+        #
+        for x, y in engine.changed:
+            cells[y][x].halite_amount = engine.halite[y][x]
+        #
+        for player in self.players.values():
+            for ship in player.get_ships():
+                self.game_map[ship.position].mark_unsafe(ship)
+            #
+            self.game_map[player.shipyard.position].structure = player.shipyard
+            for dropoff in player.get_dropoffs():
+                self.game_map[dropoff.position].structure = dropoff
+            #
+        #
+    #
+
+    def end_turn(self, commands):
+        self.commands = list(commands)
+    #
+#
+
+class localEngine:
+    # ships are [owner, x, y, cargo] and dropoffs [owner, x, y], keyed by entity id
+
+    def __init__(self, size, num_players, seed, turns=None):
+        self.size = size
+        self.num_players = num_players
+        self.rng = random.Random(seed)
+        self.turn_number = 0
+        self.max_turns = turns or max_turns_by_size[size]
+        self.halite = GenerateMap(size, num_players, self.rng)
+        self.yards = GetShipyardPositions(size, num_players)
+        for x, y in self.yards:
+            self.halite[y][x] = 0
+        #
+        self.bank = [starting_halite] * num_players
+        self.ships = {}
+        self.dropoffs = {}
+        self.next_id = 0
+        self.changed = set()
+        self.collisions = [0] * num_players
+        self.turn_times = [[] for _ in range(num_players)]
+    #
+
+    def GetStructures(self):
+        structures = {}
+        for pid, yard in enumerate(self.yards):
+            structures[yard] = pid
+        #
+        for d in self.dropoffs.values():
+            structures[(d[1], d[2])] = d[0]
+        #
+        return structures
+    #
+
+    def IsInspired(self, s):
+        if not constants.INSPIRATION_ENABLED:
+            return False
+        #
+        count = 0
+        size = self.size
+        for o in self.ships.values():
+            if o[0] != s[0]:
+                dx = abs(o[1] - s[1])
+                dy = abs(o[2] - s[2])
+                if min(dx, size - dx) + min(dy, size - dy) <= constants.INSPIRATION_RADIUS:
+                    count += 1
+                    if count >= constants.INSPIRATION_SHIP_COUNT:
+                        return True
+                    #
+                #
+            #
+        #
+        return False
+    #
+
+    def ApplyCommands(self, all_commands):
+        # same order as the real engine: spawns and constructions first, then moves, collisions, mining
+        halite = self.halite
+        size = self.size
+        self.changed = set()
+        inspired = {sid for sid, s in self.ships.items() if self.IsInspired(s)}
+        moved = set()
+        spawns = []
+        for pid, commands in enumerate(all_commands):
+            for command in commands:
+                parts = command.split()
+                if parts[0] == hlt.commands.GENERATE:
+                    if self.bank[pid] >= constants.SHIP_COST and pid not in spawns:
+                        self.bank[pid] -= constants.SHIP_COST
+                        spawns.append(pid)
+                    #
+                elif parts[0] == hlt.commands.CONSTRUCT:
+                    sid = int(parts[1])
+                    s = self.ships.get(sid)
+                    if s is None or s[0] != pid or (s[1], s[2]) in self.GetStructures():
+                        continue
+                    #
+                    cost = max(0, constants.DROPOFF_COST - s[3] - halite[s[2]][s[1]])
+                    if self.bank[pid] >= cost:
+                        self.bank[pid] -= cost
+                        halite[s[2]][s[1]] = 0
+                        self.changed.add((s[1], s[2]))
+                        self.dropoffs[self.next_id] = [pid, s[1], s[2]]
+                        self.next_id += 1
+                        del self.ships[sid]
+                    #
+                elif parts[0] == hlt.commands.MOVE:
+                    sid = int(parts[1])
+                    s = self.ships.get(sid)
+                    if s is None or s[0] != pid or sid in moved or parts[2] == hlt.commands.STAY_STILL:
+                        continue
+                    #
+                    ratio = constants.INSPIRED_MOVE_COST_RATIO if sid in inspired else constants.MOVE_COST_RATIO
+                    cost = halite[s[2]][s[1]] // ratio
+                    if s[3] < cost:
+                        continue
+                    #
+                    s[3] -= cost
+                    dx, dy = move_offsets[parts[2]]
+                    s[1] = (s[1] + dx) % size
+                    s[2] = (s[2] + dy) % size
+                    moved.add(sid)
+                else:
+                    raise ValueError("player {} sent unknown command {!r}".format(pid, command))
+                #
+            #
+        #
+        for pid in spawns:
+            self.ships[self.next_id] = [pid, self.yards[pid][0], self.yards[pid][1], 0]
+            moved.add(self.next_id)
+            self.next_id += 1
+        #
+
+        structures = self.GetStructures()
+        cells = {}
+        for sid, s in self.ships.items():
+            cells.setdefault((s[1], s[2]), []).append(sid)
+        #
+        for pos, ids in cells.items():
+            if len(ids) < 2:
+                continue
+            #
+            cargo = sum(self.ships[sid][3] for sid in ids)
+            owners = [self.ships[sid][0] for sid in ids]
+            for pid in set(owners):
+                if owners.count(pid) > 1:
+                    self.collisions[pid] += 1
+                #
+            #
+            if pos in structures:
+                self.bank[structures[pos]] += cargo
+            else:
+                halite[pos[1]][pos[0]] += cargo
+                self.changed.add(pos)
+            #
+            for sid in ids:
+                del self.ships[sid]
+            #
+        #
+
+        for sid, s in self.ships.items():
+            pos = (s[1], s[2])
+            if structures.get(pos) == s[0]:
+                self.bank[s[0]] += s[3]
+                s[3] = 0
+            elif sid not in moved:
+                cell = halite[s[2]][s[1]]
+                ratio = constants.INSPIRED_EXTRACT_RATIO if sid in inspired else constants.EXTRACT_RATIO
+                take = min((cell + ratio - 1) // ratio, constants.MAX_HALITE - s[3])
+                if take > 0:
+                    halite[s[2]][s[1]] -= take
+                    s[3] += take
+                    if sid in inspired:
+                        s[3] = min(constants.MAX_HALITE, s[3] + int(take * constants.INSPIRED_BONUS_MULTIPLIER))
+                    #
+                    self.changed.add(pos)
+                #
+            #
+        #
+    #
+
+    def Run(self, bots):
+        games = []
+        for pid, bot in enumerate(bots):
+            game = localGame(self, pid)
+            bot.Initialize(game)
+            game.ready(bot.__name__)
+            games.append(game)
+        #
+        # the first frame carries the whole map, later ones only the cells that changed
+        self.changed = set()
+        for turn in range(1, self.max_turns + 1):
+            self.turn_number = turn
+            all_commands = []
+            for pid, bot in enumerate(bots):
+                started = time.perf_counter()
+                bot.PlayTurn(games[pid])
+                self.turn_times[pid].append(time.perf_counter() - started)
+                all_commands.append(games[pid].commands or [])
+            #
+            self.ApplyCommands(all_commands)
+        #
+        return list(self.bank)
+    #
+#
+
+def GetShipyardPositions(size, num_players):
+    near = size // 4
+    far = size - 1 - size // 4
+    if num_players == 2:
+        return [(near, size // 2), (far, size // 2)]
+    #
+    return [(near, near), (far, near), (near, far), (far, far)]
+#
+
+def GenerateMap(size, num_players, rng):
+    # a few rounds of box blur over cubed noise gives the clumpy fields the real generator makes
+    tile_w = size // 2
+    tile_h = size // 2 if num_players == 4 else size
+    tile = [[int((rng.random() ** 3) * 1000) for _ in range(tile_w)] for _ in range(tile_h)]
+    for _ in range(2):
+        blurred = [[0] * tile_w for _ in range(tile_h)]
+        for y in range(tile_h):
+            for x in range(tile_w):
+                total = 0
+                for dy in (-1, 0, 1):
+                    for dx in (-1, 0, 1):
+                        total += tile[(y + dy) % tile_h][(x + dx) % tile_w]
+                    #
+                #
+                blurred[y][x] = total // 9
+            #
+        #
+        tile = blurred
+    #
+    peak = max(max(row) for row in tile) or 1
+    scale = rng.uniform(600, 1000) / peak
+    halite = [[0] * size for _ in range(size)]
+    for y in range(size):
+        for x in range(size):
+            tx = x if x < tile_w else size - 1 - x
+            ty = y if y < tile_h else size - 1 - y
+            halite[y][x] = int(tile[ty][tx] * scale)
+        #
+    #
+    return halite
+#
+
+def LoadBot(path):
+    global bot_count
+
+    # each load gets a private module so two copies of the same file keep separate globals
+    bot_count += 1
+    spec = importlib.util.spec_from_file_location("localbot{}".format(bot_count), path)
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+    return bot
+#
+
+def PlayGame(paths, size=32, seed=0, turns=None, budget=None, overrides=None, sync_planner=False):
+    # overrides is one dict of module globals per bot (or None), set before Initialize runs;
+    # sync_planner has bots run their between-turn planner inline, as there is no engine wait here
+    constants.load_constants(dict(default_constants, MAX_TURNS=turns or max_turns_by_size[size]))
+    random.seed(seed)
+    engine = localEngine(size, len(paths), seed, turns)
+    bots = [LoadBot(path) for path in paths]
+    for pid, bot in enumerate(bots):
+        if hasattr(bot, 'tiebreak'):
+            bot.tiebreak.seed(seed)
+        #
+        if budget is not None:
+            bot.turn_budget = budget
+        #
+        if sync_planner:
+            bot.planner_sync = True
+        #
+        for name, value in ((overrides and overrides[pid]) or {}).items():
+            setattr(bot, name, value)
+        #
+    #
+    scores = engine.Run(bots)
+    return scores, engine
+#
+
+def Percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play bots against each other in-process.")
+    parser.add_argument('bots', nargs='+', help="bot files; repeated to fill --players")
+    parser.add_argument('--size', type=int, default=32, choices=sorted(max_turns_by_size))
+    parser.add_argument('--players', type=int, default=2, choices=(2, 4))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--seeds', type=int, default=1, help="play this many consecutive seeds")
+    parser.add_argument('--turns', type=int, default=None)
+    parser.add_argument('--budget', type=float, default=None, help="override the bots' turn_budget")
+    parser.add_argument('--sync-planner', action='store_true', help="run the bots' next-turn planner inline after each turn")
+    parser.add_argument('--profile', action='store_true', help="run under cProfile and print the top functions")
+    args = parser.parse_args()
+
+    paths = (args.bots * args.players)[:args.players]
+    wins = [0] * len(paths)
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+    #
+    for seed in range(args.seed, args.seed + args.seeds):
+        started = time.perf_counter()
+        scores, engine = PlayGame(paths, args.size, seed, args.turns, args.budget, sync_planner=args.sync_planner)
+        wins[scores.index(max(scores))] += 1
+        slowest = ["{:.1f}/{:.1f}".format(Percentile(t, 0.5) * 1000, max(t) * 1000) for t in engine.turn_times]
+        print("seed {} scores {} collisions {} turn ms p50/max {} wall {:.1f}s".format(
+            seed, scores, engine.collisions, slowest, time.perf_counter() - started))
+    #
+    if args.profile:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    #
+    if args.seeds > 1:
+        print("wins", dict(zip(paths, wins)) if len(set(paths)) == len(paths) else wins)
+    #
+#
@@ -3,10 +3,21 @@
 # Import the Halite SDK, which will let you interact with the game.
 import hlt
 from hlt import constants
+from hlt.entity import Ship, Dropoff
 
+import sys
 import random
 import logging
 import copy
+import time
+import json
+import os
+import mmap
+import threading
+from array import array
+from itertools import accumulate
+from heapq import heappush, heappop
+from operator import add, sub
 from enum import IntEnum, auto
 
 # v1  base bot 
@@ -31,13 +42,23 @@ from enum import IntEnum, auto
 # v17 Fewer ships, better dropoff selection, don't try to move if you don't have enough halite, no SideStep in HOMING
 # v18 Ditch naive_navigate... Hooray!! Stop making ships based on map size/numplayers
 
-class shipInfo(IntEnum):
-    STATE = 0
-    GOAL = auto()
-    LASTPOS = auto()
-    PAUSE = auto()
-    DROPID = auto()
-    TURNTAKEN = auto()
+class shipRecord:
+    __slots__ = ('state', 'goal', 'lastpos', 'pause', 'dropid', 'turntaken', 'path', 'pathgoal', 'pathcost', 'pathsteps', 'reserved', 'arrival')
+    
+    def __init__(self, state, position):
+        self.state = state
+        self.goal = position
+        self.lastpos = position
+        self.pause = False
+        self.dropid = shipyard_idx
+        self.turntaken = False
+        self.path = []
+        self.pathgoal = -1
+        self.pathcost = 0
+        self.pathsteps = []
+        self.reserved = []
+        self.arrival = None
+    #
 #
 
 class shipState(IntEnum):
@@ -47,18 +68,16 @@ class shipState(IntEnum):
     HOMING = auto()
 #
 
-class dropInfo(IntEnum):
-    RADIAL = 0
-    SHIP_HERE = auto()
-    SHIP_NEAR = auto()
+class dropRecord:
+    __slots__ = ('radial', 'ship_here', 'ship_near')
+    
+    def __init__(self):
+        self.radial = 0
+        self.ship_here = None
+        self.ship_near = None
+    #
 #
 
-log_nav = False
-log_pause = False
-log_dropoffs = False
-log_here_near = False
-verbose = False
-
 useSaboteurs = False
 homing_begun = False
 reservedfordropoff = 0
@@ -68,7 +87,10 @@ radial = [[0, 1],[1, 0],[0, -1],[-1, 0],[1, 1],[1, -1],[-1, -1],[-1, 1]]
 ship_status = {}
 dropoff_status = {}
 planned_dropoffs = {}
-nav_plan = {}
+nav_plan = []
+nav_horizon = 8
+nav_area = 0
+nav_base = 0
 sizeratio2 = {
     32:{2:[0.70,2,0.7], 4:[0.75,1,0.6]}, 
     40:{2:[0.60,3,0.8], 4:[0.67,1,0.8]}, 
@@ -84,27 +106,154 @@ testmove_dir_list = {
     hlt.Direction.West : [hlt.Direction.West, hlt.Direction.North, hlt.Direction.South, hlt.Direction.East]    
 }
 
+# economy - Sweep.py overrides these to tune them
+mining_horizon = 8
+return_ratio = 0.5
+ship_cost_divisor = 100
+
 max_dropoffs = 1
 average_halite_ratio = 0
+shipfibratio = 0
+end_ship_create = 0
+map_width = 0
+map_height = 0
+explore_radius = 3
+auction_epsilon = 5
+
+# mining lookahead - a cell d steps away mined for m turns yields halite*(1-(1-1/EXTRACT_RATIO)^m)
+# over d+m turns; per ring offset, the best of those yields per turn and its d+m
+mining_rates = []
+mining_turns = []
+
+# endgame recall - once the last homing_window turns begin every ship is booked an arrival (storage, turn)
+# at its nearest storage, at most homing_capacity per storage per turn with the closest ships taking the
+# latest turns, and is recalled to that storage when homing_pace turns a step would bring it home by then
+homing_window = 100
+homing_capacity = 3
+homing_pace = 1.5
+arrival_counts = {}
+
+# whole-map dropoff scoring, rescored every dropoff_refresh turns
+dropoff_radius = 3
+dropoff_refresh = 5
+dropoff_candidates = 8
+dropoff_sites = []
+dropoff_sites_turn = -dropoff_refresh
+dropoff_sites_storage = 0
+
+# path planning - a step costs the halite burnt leaving the cell plus nav_turn_cost for the turn spent
+nav_turn_cost = 60
+path_search_limit = 600
+path_replan_ratio = 0.25
+
+# tie-break between equal x/y moves; Benchmark.py seeds it so runs repeat
+tiebreak = random.Random()
+
+# turn budget - the engine drops a turn that takes longer than 2s
+turn_budget = 1.5
+init_budget = 20
+turn_phases = [('prepass', 0.15), ('mainpass', 0.45), ('dropoffs', 0.05), ('navigation', 0.3), ('spawn', 0.05)]
+phase_deadline = {}
+turn_start = 0
+cur_phase = None
+
+# per-turn metrics, one JSON line per turn when run with --metrics
+metrics_file = None
+metrics_calls = {}
+metrics_counts = {}
+phase_times = {}
+phase_started = 0
+
+# map layers kept across turns and patched from the cells that changed, indexed like PositionToNavIndex
+halite_grid = []
+ship_grid = []
+structure_grid = []
+ship_positions = {}
+neighbour_index = []
+ring_offsets = []
+ring_order = {}
+halite_columns = []
+# summed-area table over halite_grid, valid left of column sat_stale and brought up to date on the next query
+halite_sat = []
+sat_stale = 0
+halite_total = 0
+# nav indices of the cells the last ReadFrame rewrote, None when the frame came from elsewhere
+frame_cells = None
+# cells UpdateNavPlan marked unsafe this turn, cleared again by the next ReadFrame
+marked_cells = []
+# richest halite in each halite_tile x halite_tile block, so GetRichestPosition can skip poor
+# blocks once its search radius passes richest_scan_radius
+halite_tile = 4
+tile_max = []
+tiles_high = 0
+richest_scan_radius = 4
+
+# per-turn bitmaps, bit nav_idx set when the cell holds an enemy, is next to an enemy, or has a structure
+enemy_bits = 0
+enemy_zone_bits = 0
+structure_bits = 0
+neighbour_bits = []
+# a ship or structure on the cell, one byte per cell, for the scans that test cell after cell - indexing a
+# bytearray is far cheaper than shifting a map-sized int; structure_cells only ever gains cells
+occupied_cells = bytearray()
+structure_cells = bytearray()
+threat_cargo_ratio = 0.5
+
+# per-map-size torus tables, built once at startup or read back from the on-disk cache
+table_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+table_cache_version = 1
+index_x = []
+index_y = []
+torus_dx = []
+torus_dy = []
+torus_distance = []
+
+# storages are keyed by their nav index, which cannot clash with the engine's entity ids;
+# distance to, and key of, the nearest storage for every cell
+shipyard_idx = -1
+storage_distance = []
+storage_owner = []
+storage_positions = {}
+
+# next cell toward each storage from every cell, halite-weighted like PlanPath
+storage_flow = {}
+flow_halite = 0
+flow_rebuild_ratio = 0.1
+
+# speculative planning - after end_turn a thread works ahead on the state just sent while the main
+# thread blocks in ReadFrame; the frame stops it and the turn keeps whatever still matches. In-process
+# games have no wait to fill, planner_sync runs the same work inline there so both paths can be compared
+planner_enabled = True
+planner_sync = False
+planner_thread = None
+planner_stop = threading.Event()
+planner_flow_ratio = 0.8
+spec_storage = None
+spec_flow = {}
+spec_sites = None
+spec_paths = {}
+
+fib_cache = {}
 
 def fibbing(n):
     if n == 0:
         return 0
-    elif n==1 or n==2:
-        return 1
-        
-    return fibbing(n-1)+fibbing(n-2)
+    #
+    a, b = 1, 1
+    for _ in range(n-2):
+        a, b = b, a+b
+    #
+    return b
 #
 
 def GetFib(fn, arg):
-    fibs = {}
-    if arg not in fibs:
-        fibs[arg] = fn(arg)
-    return fibs[arg]
+    if arg not in fib_cache:
+        fib_cache[arg] = fn(arg)
+    return fib_cache[arg]
 #
 
 def GetShipBuildThreshold(num):
-    return int(constants.SHIP_COST * (1+(GetFib(fibbing, num)/100))) + reservedfordropoff
+    return int(constants.SHIP_COST * (1+(GetFib(fibbing, num)/ship_cost_divisor))) + reservedfordropoff
 #    
 
 def IsAtEdgeOfMap(position, map):
@@ -115,28 +264,408 @@ def IsAtEdgeOfMap(position, map):
 #
 
 def PositionToNavIndex(position, the_map):
-    norm = the_map.normalize(position)
-    return (norm.x * the_map.width + norm.y)
+    return ((position.x % the_map.width) * the_map.width + position.y % the_map.height)
 #
 
-def GetHaliteRichness(curPos, range, the_map):
-    max_halite = 0
-    cur_halite = 0
-    range *= 4
-    adList = curPos.get_surrounding_cardinals()
-    for adjacent in adList:
-        if range > 0:
-            for ad1 in adjacent.get_surrounding_cardinals():
-                adList.append(the_map.normalize(ad1))
+def BuildTorusTables(width, height):
+    global index_x
+    global index_y
+    global torus_dx
+    global torus_dy
+    global torus_distance
+    global neighbour_index
+    
+    if LoadMapTables(width, height):
+        return
+    #
+    index_x = [idx // width for idx in range(width*height)]
+    index_y = [idx % width for idx in range(width*height)]
+    # signed shortest delta for a wrapped difference of 0..size-1
+    torus_dx = [d if d <= width // 2 else d - width for d in range(width)]
+    torus_dy = [d if d <= height // 2 else d - height for d in range(height)]
+    torus_distance = [abs(dx) + abs(dy) for dx in torus_dx for dy in torus_dy]
+    neighbour_index = [tuple(((x+dx) % width)*width + (y+dy) % height for dx, dy in ((0, -1), (0, 1), (1, 0), (-1, 0)))
+        for x in range(width) for y in range(height)]
+    SaveMapTables(width, height)
+#
+
+def GetTableCachePath(width, height):
+    return os.path.join(table_cache_dir, "tables-v{}-{}x{}.bin".format(table_cache_version, width, height))
+#
+
+def LoadMapTables(width, height):
+    global index_x
+    global index_y
+    global torus_dx
+    global torus_dy
+    global torus_distance
+    global neighbour_index
+    
+    # int32 header [version, width, height, table count (6), each table's length] then the tables;
+    # the file is mapped read-only and copied out to lists, which index faster than the mapping
+    try:
+        with open(GetTableCachePath(width, height), 'rb') as cache_file:
+            with mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # a truncated file cannot be cast to whole int32s
+                if len(mapped) % array('i').itemsize:
+                    return False
+                #
+                values = memoryview(mapped).cast('i')
+                try:
+                    count = values[3]
+                    if list(values[:4]) != [table_cache_version, width, height, 6] or len(values) != 4 + count + sum(values[4:4+count]):
+                        return False
+                    #
+                    tables = []
+                    start = 4 + count
+                    for length in values[4:4+count]:
+                        tables.append(values[start:start+length].tolist())
+                        start += length
+                    #
+                finally:
+                    values.release()
+                #
+            #
+        #
+    except (OSError, ValueError, IndexError):
+        return False
+    #
+    index_x, index_y, torus_dx, torus_dy, torus_distance, neighbours = tables
+    neighbour_index = list(zip(*[iter(neighbours)] * 4))
+    return True
+#
+
+def SaveMapTables(width, height):
+    tables = [index_x, index_y, torus_dx, torus_dy, torus_distance, [idx for neighbours in neighbour_index for idx in neighbours]]
+    values = array('i', [table_cache_version, width, height, len(tables)] + [len(table) for table in tables])
+    for table in tables:
+        values.extend(table)
+    #
+    # write aside and rename so a game starting alongside never maps a half-written file
+    path = GetTableCachePath(width, height)
+    try:
+        os.makedirs(table_cache_dir, exist_ok=True)
+        with open("{}.{}".format(path, os.getpid()), 'wb') as cache_file:
+            values.tofile(cache_file)
+        #
+        os.replace("{}.{}".format(path, os.getpid()), path)
+    except OSError:
+        pass
+    #
+#
+
+def GetDistance(source, target):
+    return torus_distance[((target.x - source.x) % map_width)*map_height + (target.y - source.y) % map_height]
+#
+
+def GetIndexDistance(source_idx, target_idx):
+    return torus_distance[((index_x[target_idx] - index_x[source_idx]) % map_width)*map_height + \
+        (index_y[target_idx] - index_y[source_idx]) % map_height]
+#
+
+def GetDelta(source, target):
+    return torus_dx[(target.x - source.x) % map_width], torus_dy[(target.y - source.y) % map_height]
+#
+
+def UpdateGridSnapshot(game):
+    global ship_positions
+    global enemy_bits
+    global enemy_zone_bits
+    global structure_bits
+    global occupied_cells
+    
+    # halite only changes where a ship mined (it is still there) or where ships vanished
+    # (collision debris lands on a neighbour, dropoffs zero their own cell), so the grid
+    # and its derived layers are patched from those cells rather than rebuilt
+    the_map = game.game_map
+    if len(halite_grid) != the_map.width * the_map.height:
+        BuildHaliteGrid(the_map)
+    #
+    positions = {}
+    for player in game.players.values():
+        for the_ship in player.get_ships():
+            positions[the_ship.id] = (PositionToNavIndex(the_ship.position, the_map), player.id)
+        #
+    #
+    touched = set()
+    for ship_id, (nav_idx, owner) in ship_positions.items():
+        ship_grid[nav_idx] = -1
+        if ship_id not in positions:
+            touched.add(nav_idx)
+            touched.update(neighbour_index[nav_idx])
+        #
+    #
+    for nav_idx, owner in positions.values():
+        ship_grid[nav_idx] = owner
+        touched.add(nav_idx)
+    #
+    ship_positions = positions
+    for player in game.players.values():
+        structure_grid[PositionToNavIndex(player.shipyard.position, the_map)] = player.id
+        structure_bits |= 1 << PositionToNavIndex(player.shipyard.position, the_map)
+        structure_cells[PositionToNavIndex(player.shipyard.position, the_map)] = 1
+        for dropoff in player.get_dropoffs():
+            structure_grid[PositionToNavIndex(dropoff.position, the_map)] = player.id
+            structure_bits |= 1 << PositionToNavIndex(dropoff.position, the_map)
+            structure_cells[PositionToNavIndex(dropoff.position, the_map)] = 1
+        #
+    #
+    
+    # one bit per cell, tested with (bits >> nav_idx) & 1
+    enemy_bits = 0
+    enemy_zone_bits = 0
+    occupied_cells = bytearray(structure_cells)
+    for nav_idx, owner in positions.values():
+        occupied_cells[nav_idx] = 1
+        if owner != game.my_id:
+            enemy_bits |= 1 << nav_idx
+            enemy_zone_bits |= neighbour_bits[nav_idx]
+        #
+    #
+    ApplyHaliteChanges(touched if frame_cells is None else frame_cells, the_map)
+#
+
+def ReadFrame(game):
+    global frame_cells
+    global marked_cells
+    
+    # stands in for hlt.Game.update_frame, which rebuilds every ship, dropoff and position and
+    # clears every cell each turn: here a ship keeps its object (and its position unless it
+    # moved), only the cells ships left or we marked are cleared and only the cells the engine lists change
+    readline = sys.stdin.readline
+    line = readline()
+    if not line:
+        raise SystemExit()
+    #
+    planner_stop.set()
+    game.turn_number = int(line)
+    logging.info("=============== TURN {:03} ================".format(game.turn_number))
+    cells = game.game_map._cells
+    width = game.game_map.width
+    left = []
+    for _ in range(len(game.players)):
+        player_id, num_ships, num_dropoffs, halite = map(int, readline().split())
+        player = game.players[player_id]
+        player.halite_amount = halite
+        previous = player._ships
+        ships = {}
+        for _ in range(num_ships):
+            ship_id, x, y, cargo = map(int, readline().split())
+            the_ship = previous.pop(ship_id, None)
+            if the_ship is None:
+                the_ship = Ship(player_id, ship_id, hlt.Position(x, y), cargo)
+            else:
+                position = the_ship.position
+                if position.x != x or position.y != y:
+                    left.append(position)
+                    the_ship.position = hlt.Position(x, y)
+                #
+                the_ship.halite_amount = cargo
             #
-            range -= 1
+            ships[ship_id] = the_ship
+        #
+        left += [the_ship.position for the_ship in previous.values()]
+        player._ships = ships
+        for _ in range(num_dropoffs):
+            dropoff_id, x, y = map(int, readline().split())
+            if dropoff_id not in player._dropoffs:
+                player._dropoffs[dropoff_id] = Dropoff(player_id, dropoff_id, hlt.Position(x, y))
+                cells[y][x].structure = player._dropoffs[dropoff_id]
+            #
+        #
+        cells[player.shipyard.position.y][player.shipyard.position.x].structure = player.shipyard
+    #
+    for position in left + marked_cells:
+        cells[position.y % game.game_map.height][position.x % width].ship = None
+    #
+    marked_cells = []
+    for player in game.players.values():
+        for the_ship in player._ships.values():
+            cells[the_ship.position.y][the_ship.position.x].ship = the_ship
+        #
+    #
+    frame_cells = []
+    for _ in range(int(readline())):
+        x, y, halite = map(int, readline().split())
+        cells[y][x].halite_amount = halite
+        frame_cells.append(x*width + y)
+    #
+#
+
+def BuildHaliteGrid(the_map):
+    global halite_grid
+    global ship_grid
+    global structure_grid
+    global ship_positions
+    global neighbour_bits
+    global structure_bits
+    global structure_cells
+    global halite_total
+    
+    width = the_map.width
+    height = the_map.height
+    halite_grid = [cell.halite_amount for column in zip(*the_map._cells) for cell in column]
+    ship_grid = [-1] * len(halite_grid)
+    structure_grid = [-1] * len(halite_grid)
+    ship_positions = {}
+    # a cell and its four neighbours
+    neighbour_bits = [(1 << nav_idx) | sum(1 << next_idx for next_idx in neighbours) for nav_idx, neighbours in enumerate(neighbour_index)]
+    structure_bits = 0
+    structure_cells = bytearray(len(halite_grid))
+    halite_total = sum(halite_grid)
+    BuildHaliteColumns(width, height)
+    BuildHaliteTiles(width, height)
+#
+
+def ApplyHaliteChanges(touched, the_map):
+    global halite_total
+    global average_halite_ratio
+    
+    cells = the_map._cells
+    width = the_map.width
+    dirty = set()
+    dirty_tiles = set()
+    for nav_idx in touched:
+        x = nav_idx // width
+        y = nav_idx - x*width
+        halite = cells[y][x].halite_amount
+        if halite != halite_grid[nav_idx]:
+            halite_total += halite - halite_grid[nav_idx]
+            halite_grid[nav_idx] = halite
+            dirty.add(x)
+            dirty_tiles.add((x // halite_tile)*tiles_high + y // halite_tile)
+        #
+    #
+    for x in dirty:
+        UpdateHaliteColumn(x, width, the_map.height)
+    #
+    for tile_idx in dirty_tiles:
+        UpdateHaliteTile(tile_idx, width, the_map.height)
+    #
+    average_halite_ratio = halite_total / (len(halite_grid) * constants.MAX_HALITE)
+#
+
+def GetRingOffsets(radius):
+    global ring_offsets
+    global ring_order
+    
+    # (dx, dy) offsets ordered by distance, cardinals first
+    if len(ring_offsets) < 2*radius*(radius+1):
+        ring_offsets = []
+        for dist in range(1, radius+1):
+            ring_offsets += [(0, -dist), (0, dist), (dist, 0), (-dist, 0)]
+            for step in range(1, dist):
+                ring_offsets += [(step, step-dist), (step, dist-step), (-step, dist-step), (-step, step-dist)]
+            #
+        #
+        ring_order = {offset: order for order, offset in enumerate(ring_offsets)}
+    #
+    return ring_offsets
+#
+
+def BuildHaliteTiles(width, height):
+    global tile_max
+    global tiles_high
+    
+    tiles_high = -(-height // halite_tile)
+    tile_max = [0] * (-(-width // halite_tile) * tiles_high)
+    for tile_idx in range(len(tile_max)):
+        UpdateHaliteTile(tile_idx, width, height)
+    #
+#
+
+def UpdateHaliteTile(tile_idx, width, height):
+    x0 = (tile_idx // tiles_high) * halite_tile
+    y0 = (tile_idx % tiles_high) * halite_tile
+    y1 = min(y0 + halite_tile, height)
+    tile_max[tile_idx] = max(max(halite_grid[x*width+y0:x*width+y1]) for x in range(x0, min(x0 + halite_tile, width)))
+#
+
+def BuildHaliteColumns(width, height):
+    global halite_columns
+    global halite_sat
+    global sat_stale
+    
+    # running sums down each column, halite_columns[x*(height+1) + y] = sum of cells above y in column x
+    halite_columns = []
+    for x in range(width):
+        halite_columns.append(0)
+        halite_columns += accumulate(halite_grid[x*height:(x+1)*height])
+    #
+    halite_sat = [0] * ((width+1) * (height+1))
+    sat_stale = 0
+#
+
+def UpdateHaliteColumn(x, width, height):
+    global sat_stale
+    
+    stride = height + 1
+    halite_columns[x*stride+1:(x+1)*stride] = accumulate(halite_grid[x*height:(x+1)*height])
+    sat_stale = min(sat_stale, x)
+#
+
+def UpdateHaliteSAT(width, height):
+    global sat_stale
+    
+    # halite_sat[x*(height+1) + y] = sum of cells left of x and above y, so each column is the one
+    # before plus that column's running sums; only the columns from the first patched one on are redone
+    stride = height + 1
+    for x in range(sat_stale, width):
+        halite_sat[(x+1)*stride:(x+2)*stride] = map(add, halite_sat[x*stride:(x+1)*stride], halite_columns[x*stride:(x+1)*stride])
+    #
+    sat_stale = width
+#
+
+def GetRectSum(x0, y0, x1, y1, height):
+    stride = height + 1
+    return halite_sat[x1*stride+y1] - halite_sat[x0*stride+y1] - halite_sat[x1*stride+y0] + halite_sat[x0*stride+y0]
+#
+
+def GetWindowSum(x, y, radius, width, height):
+    # sum the (2r+1)x(2r+1) box around x,y, split into at most four unwrapped rectangles
+    if sat_stale < width:
+        UpdateHaliteSAT(width, height)
+    #
+    x0 = (x - radius) % width
+    x1 = x0 + 2*radius + 1
+    y0 = (y - radius) % height
+    y1 = y0 + 2*radius + 1
+    xspans = [(x0, x1)] if x1 <= width else [(x0, width), (0, x1-width)]
+    yspans = [(y0, y1)] if y1 <= height else [(y0, height), (0, y1-height)]
+    total = 0
+    for xa, xb in xspans:
+        for ya, yb in yspans:
+            total += GetRectSum(xa, ya, xb, yb, height)
         #
-        cur_halite += the_map[adjacent].halite_amount
-        max_halite += constants.MAX_HALITE
     #
-    #if log_dropoffs:
-    #    logging.info("Test {} CurHalite {} MaxHalite {} Ratio {}".format(curPos, cur_halite, max_halite, cur_halite/max_halite))
+    return total
+#
+
+def GetWindowSums(grid, radius, width, height):
+    # GetWindowSum for every cell at once - a wrapped running sum down each column, then across columns
+    span = 2*radius + 1
+    columns = []
+    for x in range(width):
+        values = grid[x*height:(x+1)*height]
+        prefix = [0]
+        prefix += accumulate(values[-radius:] + values + values[:radius])
+        columns.append(list(map(sub, prefix[span:], prefix[:-span])))
+    #
+    window = [0] * height
+    for dx in range(-radius, radius+1):
+        window = list(map(add, window, columns[dx % width]))
     #
+    sums = []
+    for x in range(width):
+        sums += window
+        window = list(map(sub, map(add, window, columns[(x+radius+1) % width]), columns[(x-radius) % width]))
+    #
+    return sums
+#
+
+def GetHaliteRichness(curPos, range, the_map):
+    cur_halite = GetWindowSum(curPos.x % the_map.width, curPos.y % the_map.height, range, the_map.width, the_map.height)
+    max_halite = (2*range+1) * (2*range+1) * constants.MAX_HALITE
     return cur_halite / max_halite
 #
 
@@ -144,31 +673,28 @@ def GetRichestPosition(curPos, range, mustmove, avoidedges, map):
     global nav_plan
     
     first = mustmove
-    range *= 4
+    width = map.width
+    height = map.height
+    x = curPos.x % width
+    y = curPos.y % height
     best = curPos
-    max = map[curPos].halite_amount
-    adList = curPos.get_surrounding_cardinals()
-    for adjacent in adList:
-        if range > 0:
-            for ad1 in adjacent.get_surrounding_cardinals():
-                adList.append(map.normalize(ad1))
-            #
-            range -= 1
-        #
-        nav_idx = PositionToNavIndex(adjacent, map)
-        if map[adjacent].is_empty and not nav_idx in nav_plan and \
-            ((first and map[adjacent].halite_amount >= max) or (map[adjacent].halite_amount > max)):
+    max = halite_grid[x*width + y]
+    radius = range + 1
+    if radius > richest_scan_radius and 2*radius < min(width, height):
+        return GetRichestTilePosition(curPos, radius, mustmove, avoidedges, map)
+    #
+    for dx, dy in GetRingOffsets(radius)[:2*radius*(radius+1)]:
+        nx = (x + dx) % width
+        ny = (y + dy) % height
+        nav_idx = nx*width + ny
+        halite = halite_grid[nav_idx]
+        if not occupied_cells[nav_idx] and nav_plan[nav_base + nav_idx] < 0 and \
+            ((first and halite >= max) or (halite > max)):
             
-            adjacent = map.normalize(adjacent)
-            if avoidedges:
-                if not IsAtEdgeOfMap(ad1, map):
-                    best = adjacent
-                    max = map[adjacent].halite_amount
-                    first = False
-                #
-            else:
+            adjacent = hlt.Position(nx, ny)
+            if not avoidedges or not IsAtEdgeOfMap(adjacent, map):
                 best = adjacent
-                max = map[adjacent].halite_amount
+                max = halite
                 first = False
             #
         #
@@ -176,81 +702,524 @@ def GetRichestPosition(curPos, range, mustmove, avoidedges, map):
     return best
 #
 
+def GetRichestTilePosition(curPos, radius, mustmove, avoidedges, map):
+    # same answer as the ring scan in GetRichestPosition: the richest free cell within radius
+    # (at least as rich as curPos when it must move, richer otherwise), ties going to the first
+    # in ring order. Blocks are visited richest first and the search stops at one too poor to win
+    width = map.width
+    height = map.height
+    x = curPos.x % width
+    y = curPos.y % height
+    GetRingOffsets(radius)
+    limit = 2*radius*(radius+1)
+    tiles_wide = len(tile_max) // tiles_high
+    tiles = set()
+    for tx in range((x - radius) // halite_tile, (x + radius) // halite_tile + 1):
+        for ty in range((y - radius) // halite_tile, (y + radius) // halite_tile + 1):
+            tiles.add((tx % tiles_wide)*tiles_high + ty % tiles_high)
+        #
+    #
+    floor = halite_grid[x*width + y] - (1 if mustmove else 0)
+    best_idx = -1
+    best_halite = floor
+    best_order = 0
+    for tile_idx in sorted(tiles, key=lambda tile_idx: -tile_max[tile_idx]):
+        if tile_max[tile_idx] < best_halite or tile_max[tile_idx] <= floor:
+            break
+        #
+        x0 = (tile_idx // tiles_high) * halite_tile
+        y0 = (tile_idx % tiles_high) * halite_tile
+        for nx in range(x0, min(x0 + halite_tile, width)):
+            dx = torus_dx[(nx - x) % width]
+            for ny in range(y0, min(y0 + halite_tile, height)):
+                nav_idx = nx*width + ny
+                halite = halite_grid[nav_idx]
+                if halite <= floor or halite < best_halite:
+                    continue
+                #
+                order = ring_order.get((dx, torus_dy[(ny - y) % height]), limit)
+                if order >= limit or (halite == best_halite and order > best_order) or \
+                    occupied_cells[nav_idx] or nav_plan[nav_base + nav_idx] >= 0 or \
+                    (avoidedges and (nx == 0 or nx == width-1 or ny == 0 or ny == height-1)):
+                    continue
+                #
+                best_idx = nav_idx
+                best_halite = halite
+                best_order = order
+            #
+        #
+    #
+    if best_idx < 0:
+        return curPos
+    #
+    return hlt.Position(index_x[best_idx], index_y[best_idx])
+#
+
+def StartTurnClock():
+    global turn_start
+    global phase_deadline
+    global phase_started
+    global cur_phase
+    
+    # deadlines are cumulative, so a phase that finishes early hands its slack on
+    turn_start = time.time()
+    phase_started = turn_start
+    cur_phase = None
+    share = 0
+    for phase, phase_share in turn_phases:
+        share += phase_share
+        phase_deadline[phase] = turn_start + share * turn_budget
+    #
+#
+
+def StartPhase(phase):
+    global cur_phase
+    
+    if metrics_file:
+        RecordPhaseTime()
+    #
+    cur_phase = phase
+#
+
+def IsOverBudget():
+    # outside a turn (tools calling in directly) there is no deadline
+    return cur_phase is not None and time.time() > phase_deadline[cur_phase]
+#
+
+def CountCalls(fn):
+    name = fn.__name__
+    metrics_calls[name] = 0
+    def counted(*args, **kwargs):
+        metrics_calls[name] += 1
+        return fn(*args, **kwargs)
+    #
+    return counted
+#
+
+def EnableMetrics(path):
+    global metrics_file
+    
+    # the counting wrappers are only swapped in here, so a normal run calls the bare functions
+    metrics_file = open(path, 'w')
+    for name in ('GetRichestPosition', 'GetHaliteRichness', 'TestMove', 'GetDistance'):
+        globals()[name] = CountCalls(globals()[name])
+    #
+#
+
+def RecordPhaseTime():
+    global phase_started
+    
+    now = time.time()
+    if cur_phase is not None:
+        phase_times[cur_phase] = round((now - phase_started) * 1000, 3)
+    #
+    phase_started = now
+#
+
+def EmitMetrics(game, command_buffer):
+    if not metrics_file:
+        return
+    #
+    RecordPhaseTime()
+    record = {
+        'turn': game.turn_number,
+        'ships': len(game.me.get_ships()),
+        'phase_ms': phase_times,
+        'calls': metrics_calls,
+        'pauses': sum(1 for command in command_buffer if command.endswith(' o')),
+    }
+    record.update(metrics_counts)
+    metrics_file.write(json.dumps(record, separators=(',', ':')) + '\n')
+    metrics_file.flush()
+    for name in metrics_calls:
+        metrics_calls[name] = 0
+    #
+    metrics_counts.clear()
+    phase_times.clear()
+#
+
+def BuildMiningRates():
+    global mining_rates
+    global mining_turns
+    
+    kept = 1 - 1 / constants.EXTRACT_RATIO
+    mining_rates = []
+    mining_turns = []
+    for dx, dy in GetRingOffsets(explore_radius)[:2*explore_radius*(explore_radius+1)]:
+        dist = abs(dx) + abs(dy)
+        rate, turns = max(((1 - kept**mine) / (dist + mine), dist + mine) for mine in range(1, mining_horizon+1))
+        mining_rates.append(rate)
+        mining_turns.append(turns)
+    #
+#
+
+def GetStayingShips(ships, the_map):
+    # every ship at once: the halite staying makes this turn against the best per-turn rate from
+    # moving to a free cell nearby (net of the cost of leaving), and the ids of those that should stay
+    width = the_map.width
+    height = the_map.height
+    offsets = GetRingOffsets(explore_radius)[:2*explore_radius*(explore_radius+1)]
+    blocked = occupied_cells
+    staying = set()
+    for the_ship in ships:
+        x = the_ship.position.x
+        y = the_ship.position.y
+        halite = halite_grid[x*width + y]
+        space = constants.MAX_HALITE - the_ship.halite_amount
+        leave = halite // constants.MOVE_COST_RATIO
+        if the_ship.halite_amount < leave:
+            staying.add(the_ship.id)
+            continue
+        #
+        stay = min(-(-halite // constants.EXTRACT_RATIO), space)
+        if stay <= 0:
+            continue
+        #
+        best = 0
+        for (dx, dy), rate, turns in zip(offsets, mining_rates, mining_turns):
+            nav_idx = ((x + dx) % width)*width + (y + dy) % height
+            if not blocked[nav_idx]:
+                best = max(best, min(halite_grid[nav_idx] * rate, space / turns) - leave / turns)
+            #
+        #
+        if stay >= best:
+            staying.add(the_ship.id)
+        #
+    #
+    return staying
+#
+
+def GetExploreCandidates(the_ship, claimed, the_map):
+    # (nav_idx, value) for every free cell richer than the ship's own cell
+    width = the_map.width
+    height = the_map.height
+    x = the_ship.position.x
+    y = the_ship.position.y
+    cur_halite = halite_grid[x*width + y]
+    mustmove = cur_halite == 0
+    # running late - only look at the neighbours
+    radius = 1 if IsOverBudget() else explore_radius
+    candidates = []
+    for dx, dy in GetRingOffsets(radius)[:2*radius*(radius+1)]:
+        nav_idx = ((x + dx) % width)*width + (y + dy) % height
+        halite = halite_grid[nav_idx]
+        if (halite > cur_halite or (mustmove and halite >= cur_halite)) and nav_idx not in claimed and \
+            not occupied_cells[nav_idx] and nav_plan[nav_base + nav_idx] < 0:
+            
+            candidates.append((nav_idx, 1 + halite / (1 + abs(dx) + abs(dy))))
+        #
+    #
+    return candidates
+#
+
+def AssignExploreGoals(ships, the_map):
+    global ship_status
+    
+    if not ships:
+        return
+    #
+    
+    # goals already held by exploring ships are off the table
+    claimed = set()
+    for info in ship_status.values():
+        if info.state == shipState.EXPLORING and info.goal is not None:
+            claimed.add(PositionToNavIndex(info.goal, the_map))
+        #
+    #
+    candidates = [GetExploreCandidates(the_ship, claimed, the_map) for the_ship in ships]
+    
+    # auction: unassigned ships bid for their best cell net of price, outbid ships re-enter the queue
+    # staying put is a private option worth 0, so every ship drops out once prices pass its values
+    prices = {}
+    owner = {}
+    assigned = [None] * len(ships)
+    unassigned = list(range(len(ships)))
+    bids = 0
+    while unassigned:
+        # out of time - whoever is still unassigned keeps its position
+        bids += 1
+        if bids % 32 == 0 and IsOverBudget():
+            break
+        #
+        ship_idx = unassigned.pop()
+        best_idx = None
+        best_net = 0
+        second_net = 0
+        for nav_idx, value in candidates[ship_idx]:
+            net = value - prices.get(nav_idx, 0)
+            if net > best_net:
+                second_net = best_net
+                best_net = net
+                best_idx = nav_idx
+            elif net > second_net:
+                second_net = net
+            #
+        #
+        if best_idx is None:
+            continue
+        #
+        prices[best_idx] = prices.get(best_idx, 0) + best_net - second_net + auction_epsilon
+        if best_idx in owner:
+            assigned[owner[best_idx]] = None
+            unassigned.append(owner[best_idx])
+        #
+        owner[best_idx] = ship_idx
+        assigned[ship_idx] = best_idx
+    #
+    
+    for the_ship, nav_idx in zip(ships, assigned):
+        if nav_idx is None:
+            ship_status[the_ship.id].goal = the_ship.position
+        else:
+            ship_status[the_ship.id].goal = hlt.Position(index_x[nav_idx], index_y[nav_idx])
+        #
+    #
+#
+
+def UpdateDropoffSites(me, the_map, turn_number):
+    global dropoff_sites
+    global dropoff_sites_turn
+    global dropoff_sites_storage
+    
+    # rescore the whole map every few turns, or as soon as a new dropoff changes the storage field
+    if len(me.get_dropoffs()) + len(planned_dropoffs) >= max_dropoffs:
+        dropoff_sites = []
+        return
+    #
+    if turn_number - dropoff_sites_turn < dropoff_refresh and dropoff_sites_storage == len(storage_positions):
+        return
+    #
+    dropoff_sites_turn = turn_number
+    dropoff_sites_storage = len(storage_positions)
+    dropoff_sites = ScoreDropoffSites(me.id, [PositionToNavIndex(position, the_map) for position in planned_dropoffs.values()], the_map)
+#
+
+def ScoreDropoffSites(my_id, planned, the_map):
+    width = the_map.width
+    height = the_map.height
+    min_distance = height / 4
+    
+    # box density around every cell, scaled up where our ships already work and the nearest
+    # storage is far, down where enemy ships crowd in
+    density = GetWindowSums(halite_grid, dropoff_radius, width, height)
+    friends = GetWindowSums([1 if owner == my_id else 0 for owner in ship_grid], dropoff_radius, width, height)
+    enemies = GetWindowSums([1 if owner >= 0 and owner != my_id else 0 for owner in ship_grid], dropoff_radius, width, height)
+    ranked = sorted(((density[idx] * (1 + friends[idx]) * storage_distance[idx] / (1 + enemies[idx]), idx)
+        for idx in range(len(density)) if storage_distance[idx] >= min_distance and structure_grid[idx] < 0), reverse=True)
+    enemy_structures = [idx for idx, owner in enumerate(structure_grid) if owner >= 0 and owner != my_id]
+    
+    # keep the best few sites that are not just neighbours of a better one
+    sites = []
+    for score, idx in ranked:
+        if len(sites) == dropoff_candidates:
+            break
+        #
+        if IsAtEdgeOfMap(hlt.Position(index_x[idx], index_y[idx]), the_map) or \
+            any(GetIndexDistance(idx, other) < min_distance for other in planned) or \
+            any(GetIndexDistance(idx, other) < min_distance for other in enemy_structures) or \
+            any(GetIndexDistance(idx, site) <= dropoff_radius for score, site in sites):
+            continue
+        #
+        sites.append((score, idx))
+    #
+    return sites
+#
+
 def ConvertToDropoff(ship, me, av_storage_dist, map):
     global planned_dropoffs
     global max_dropoffs
     global average_halite_ratio
     
-    #if log_dropoffs:
-    #    d_count = len(me.get_dropoffs()) + len(planned_dropoffs)
-    #    logging.info("Num Ships {} Avg Dist {} Halite {} Dropoffs {} AV Halite {}".format(numships, av_storage_dist, me.halite_amount, d_count, average_halite_ratio))
-    #    
-    
     min_distance = map.height / 4
     if ((av_storage_dist > min_distance) or len(me.get_ships()) > (1+len(me.get_dropoffs()))*10) and \
         (me.halite_amount > int(constants.DROPOFF_COST * dropoffcostoverhead)) and \
         (len(me.get_dropoffs()) + len(planned_dropoffs) < max_dropoffs) and \
-        (GetHaliteRichness(ship.position, 3, map) >= average_halite_ratio):
+        (GetHaliteRichness(ship.position, dropoff_radius, map) >= average_halite_ratio):
         
-        distance = map.calculate_distance(ship.position, me.shipyard.position)
-        #if log_dropoffs:
-        #    logging.info("Base conditions met - checking for distance")
-        #    logging.info("Shipyard Distance {}".format(distance))
-        #    
-        far_enough = distance >= min_distance
-        for dropoff in me.get_dropoffs():
-            distance = map.calculate_distance(ship.position, dropoff.position)
-            #if log_dropoffs:
-            #    logging.info("Dropoff {} Distance {}".format(dropoff.id, distance))
-            #    
-            far_enough = far_enough and (distance >= min_distance)
-        #
-        for dropoff, position in planned_dropoffs.items():
-            distance = map.calculate_distance(ship.position, position)
-            #if log_dropoffs:
-            #    logging.info("Planned Dropoff {} Distance {}".format(dropoff, distance))
-            #    
-            far_enough = far_enough and (distance >= min_distance)
-        #
-        if far_enough:
-            dropoffpos = GetRichestPosition(ship.position, 2, False, True, map)
-            planned_dropoffs[ship.id] = dropoffpos
-            #if log_dropoffs:
-            #    logging.info("Dropoff Approved")
-            #    
-            return True, dropoffpos
-        #
-    #
-    #if log_dropoffs:
-    #    logging.info("Dropoff Denied")
+        # best cached site within reach of this ship, skipping any too close to a dropoff planned since the scoring
+        best = None
+        best_value = 0
+        for score, site_idx in dropoff_sites:
+            site = hlt.Position(index_x[site_idx], index_y[site_idx])
+            distance = GetDistance(ship.position, site)
+            if distance > min_distance / 2:
+                continue
+            #
+            if any(GetDistance(site, position) < min_distance for position in planned_dropoffs.values()):
+                continue
+            #
+            value = score / (1 + distance)
+            if value > best_value:
+                best = site
+                best_value = value
+            #
+        #
+        if best is not None:
+            planned_dropoffs[ship.id] = best
+            return True, best
+        #
     #
     return False, None    
 #
 
-def GetClosestStoragePosition(position, me, map):
-    storageindex = 0
-    min = map.calculate_distance(ship.position, me.shipyard.position)
-    pos = me.shipyard.position
-    for dropoff in me.get_dropoffs():
-        dist = map.calculate_distance(ship.position, dropoff.position)
-        if (dist <= min):
-            min = dist
-            pos = dropoff.position
-            storageindex = dropoff.id
+def AddStorage(storage_idx, position, the_map):
+    global storage_distance
+    global storage_owner
+    global storage_positions
+    
+    storage_positions[storage_idx] = position
+    storage_distance, storage_owner = MergeStorage(storage_idx, the_map)
+#
+
+def MergeStorage(storage_idx, the_map):
+    # the field with one more storage folded in, as new lists
+    if not storage_distance:
+        distance = [GetIndexDistance(idx, storage_idx) for idx in range(the_map.width * the_map.height)]
+        return distance, [storage_idx] * len(distance)
+    #
+    distance = storage_distance[:]
+    owner = storage_owner[:]
+    for idx in range(len(distance)):
+        dist = GetIndexDistance(idx, storage_idx)
+        if dist <= distance[idx]:
+            distance[idx] = dist
+            owner[idx] = storage_idx
         #
     #
-    return pos,storageindex
+    return distance, owner
 #
 
-def IsOnAnyDropoff(the_ship, me):
-    if the_ship.position == me.shipyard.position:
-        return 0
+def UpdateStorageField(me, the_map):
+    global storage_distance
+    global storage_owner
+    global spec_storage
+    global shipyard_idx
+    
+    # only new dropoffs touch the field; one the planner merged ahead is taken as it is
+    if not storage_positions:
+        shipyard_idx = PositionToNavIndex(me.shipyard.position, the_map)
+        AddStorage(shipyard_idx, me.shipyard.position, the_map)
     #
     for dropoff in me.get_dropoffs():
-        if the_ship.position == dropoff.position:
-            return dropoff.id
+        dropoff_idx = PositionToNavIndex(dropoff.position, the_map)
+        if dropoff_idx not in storage_positions:
+            if spec_storage and spec_storage[0] == dropoff_idx and spec_storage[1] == len(storage_positions):
+                storage_positions[dropoff_idx] = dropoff.position
+                storage_distance = spec_storage[2]
+                storage_owner = spec_storage[3]
+            else:
+                AddStorage(dropoff_idx, dropoff.position, the_map)
+            #
+        #
+    #
+    spec_storage = None
+#
+
+def BuildFlowField(target, the_map):
+    # Dijkstra out from the storage on target over the cost of stepping toward it, so the returned
+    # flow[idx] is where a ship on idx should go next; equal-cost steps favour the diagonal like PlanPath
+    tx = index_x[target]
+    ty = index_y[target]
+    balance = [abs(abs(torus_dx[(x - tx) % map_width]) - abs(torus_dy[(y - ty) % map_height])) for x, y in zip(index_x, index_y)]
+    cost = [-1] * len(halite_grid)
+    flow = [target] * len(halite_grid)
+    cost[target] = 0
+    frontier = [(0, target)]
+    while frontier:
+        dist, nav_idx = heappop(frontier)
+        if dist > cost[nav_idx]:
+            continue
+        #
+        for prev_idx in neighbour_index[nav_idx]:
+            prev_cost = dist + halite_grid[prev_idx] // constants.MOVE_COST_RATIO + nav_turn_cost
+            if cost[prev_idx] < 0 or prev_cost < cost[prev_idx]:
+                cost[prev_idx] = prev_cost
+                flow[prev_idx] = nav_idx
+                heappush(frontier, (prev_cost, prev_idx))
+            elif prev_cost == cost[prev_idx] and balance[nav_idx] < balance[flow[prev_idx]]:
+                flow[prev_idx] = nav_idx
+            #
+        #
+    #
+    return flow
+#
+
+def UpdateFlowFields(the_map):
+    global flow_halite
+    
+    # a new dropoff only needs its own field; all of them are redone once the map's halite has drifted
+    if abs(halite_total - flow_halite) > flow_halite * flow_rebuild_ratio and not IsOverBudget():
+        flow_halite = halite_total
+        storage_flow.clear()
+    #
+    for storage_idx in storage_positions:
+        if storage_idx not in storage_flow:
+            storage_flow[storage_idx] = BuildFlowField(storage_idx, the_map)
         #
     #
+#
+
+def CancelDropoff(ship_id):
+    global planned_dropoffs
+    global reservedfordropoff
+    
+    # hand back the halite held for a dropoff that will not be built
+    if ship_id in planned_dropoffs:
+        del planned_dropoffs[ship_id]
+        reservedfordropoff -= int(constants.DROPOFF_COST * dropoffcostoverhead)
+    #
+#
+
+def PruneShipStatus(me):
+    global ship_status
+    global dropoff_status
+    
+    # forget ships that were destroyed or turned into dropoffs
+    for ship_id in [ship_id for ship_id in ship_status if not me.has_ship(ship_id)]:
+        CancelDropoff(ship_id)
+        ReleasePath(ship_id)
+        if ship_status[ship_id].arrival is not None:
+            arrival_counts[ship_status[ship_id].arrival] -= 1
+        #
+        del ship_status[ship_id]
+    #
+    for drop_id in [drop_id for drop_id in dropoff_status if drop_id not in storage_positions]:
+        del dropoff_status[drop_id]
+    #
+#
+
+def ScheduleHoming(ships, the_map, turn_number):
+    # books every tracked ship not booked yet, so after the first pass only new ships cost anything
+    if constants.MAX_TURNS - turn_number >= homing_window:
+        return
+    #
+    unbooked = [(storage_distance[nav_idx], the_ship.id, storage_owner[nav_idx]) for the_ship, nav_idx in
+        ((the_ship, PositionToNavIndex(the_ship.position, the_map)) for the_ship in ships
+        if the_ship.id in ship_status and ship_status[the_ship.id].arrival is None)]
+    for distance, ship_id, storage_idx in sorted(unbooked):
+        slot = constants.MAX_TURNS - 1
+        while slot > turn_number and arrival_counts.get((storage_idx, slot), 0) >= homing_capacity:
+            slot -= 1
+        #
+        arrival_counts[(storage_idx, slot)] = arrival_counts.get((storage_idx, slot), 0) + 1
+        ship_status[ship_id].arrival = (storage_idx, slot)
+    #
+#
+
+def GetClosestStoragePosition(position, me, map):
+    storageindex = storage_owner[PositionToNavIndex(position, map)]
+    return storage_positions[storageindex], storageindex
+#
+
+def GetStorageDistance(position, the_map):
+    return storage_distance[PositionToNavIndex(position, the_map)]
+#
+
+def IsOnAnyDropoff(the_ship, the_map):
+    nav_idx = PositionToNavIndex(the_ship.position, the_map)
+    if storage_distance[nav_idx] == 0:
+        return storage_owner[nav_idx]
+    #
     return -1
 #
 
@@ -258,77 +1227,74 @@ def GetRadialExplorePos(pos, dropid, max_radial):
     global radial
     global dropoff_status
     if dropid not in dropoff_status:
-        dropoff_status[dropid] = [0, None, None]
+        dropoff_status[dropid] = dropRecord()
     #
-    mul = 1+int(dropoff_status[dropid][dropInfo.RADIAL]/8)
-    idx = dropoff_status[dropid][dropInfo.RADIAL] % 8
+    mul = 1+int(dropoff_status[dropid].radial/8)
+    idx = dropoff_status[dropid].radial % 8
     offset = radial[idx]
     radpos = copy.deepcopy(pos)
     radpos.x += offset[0]*mul
     radpos.y += offset[1]*mul
-    dropoff_status[dropid][dropInfo.RADIAL] += 1
-    #if dropoff_status[dropid][dropInfo.RADIAL] > max_radial:
-    #    dropoff_status[dropid][dropInfo.RADIAL] = 1
+    dropoff_status[dropid].radial += 1
+    #if dropoff_status[dropid].radial > max_radial:
+    #    dropoff_status[dropid].radial = 1
     #
     return radpos
 #
 
-def BlockNavIndex(the_ship, position, the_map):
+def ResetNavPlan(the_map):
     global nav_plan
-    global log_pause
+    global nav_area
+    
+    # space-time reservations, one map-sized slot per turn in a ring of nav_horizon turns
+    nav_area = the_map.width * the_map.height
+    nav_plan = [-1] * (nav_area * nav_horizon)
+#
 
-    nav_idx = PositionToNavIndex(position, the_map)
-    #if log_pause:
-    #    plan = -1
-    #    if nav_idx in nav_plan:
-    #        plan = nav_plan[nav_idx]
-    #    #
-    #    logging.info("NAV_IDX {} NAV_PLAN {}".format(nav_idx, plan))
-    #
-    nav_plan[nav_idx] = the_ship.id
-    #if log_pause:
-    #    logging.info("Mark NAV_PLAN".format(nav_idx, nav_plan[nav_idx]))
-    #
+def RollNavPlan(turn_number):
+    global nav_plan
+    global nav_base
+    
+    # free the slot of the turn that just ended, it becomes the furthest future turn; path
+    # reservations for this turn are dropped too, ResolveMoves settles the current turn
+    expired = ((turn_number - 1) % nav_horizon) * nav_area
+    nav_plan[expired:expired+nav_area] = [-1] * nav_area
+    nav_base = (turn_number % nav_horizon) * nav_area
+    nav_plan[nav_base:nav_base+nav_area] = [-1] * nav_area
+#
+
+def GetNavSlot(turns_ahead):
+    return (nav_base + turns_ahead * nav_area) % len(nav_plan)
+#
 
+def BlockNavIndex(the_ship, position, the_map, turns_ahead=0):
+    global nav_plan
+
+    nav_idx = GetNavSlot(turns_ahead) + PositionToNavIndex(position, the_map)
+    nav_plan[nav_idx] = the_ship.id
 #
 
 def UpdateNavPlan(the_ship, the_map, position):
     global ship_status
     global nav_plan
-    global log_pause
 
     # update the nav_map
     nav_idx = PositionToNavIndex(the_ship.position, the_map)
-    #if log_pause:
-    #    if nav_idx in nav_plan:
-    #        plan = nav_plan[nav_idx]
-    #    #
-    #    logging.info("NAV_IDX {} NAV_PLAN {}".format(nav_idx, plan))
-    #
-    if nav_idx in nav_plan and nav_plan[nav_idx] == the_ship.id:
-        del nav_plan[nav_idx]
-        #if log_pause:
-        #    logging.info("Clear NAV_PLAN")
-        #
+    if nav_plan[nav_base + nav_idx] == the_ship.id:
+        nav_plan[nav_base + nav_idx] = -1
     #
     BlockNavIndex(the_ship, position, the_map)
 	
 	# mark the map
     the_map[position].mark_unsafe(the_ship)
+    marked_cells.append(position)
 	
 	# mark the ship status
-    ship_status[the_ship.id][shipInfo.PAUSE] = (the_ship.position == position)
-    ship_status[the_ship.id][shipInfo.TURNTAKEN] = True
+    ship_status[the_ship.id].pause = (the_ship.position == position)
+    ship_status[the_ship.id].turntaken = True
 #
 
 def PauseShip(the_ship, the_map, command_buffer):
-    global log_nav
-    global log_pause
-	
-    #if log_nav:
-    #    logging.info("Ship {} Pausing".format(the_ship.id))
-    #
-    
     # Update Nav Details
     UpdateNavPlan(the_ship, the_map, the_ship.position)
 
@@ -336,162 +1302,500 @@ def PauseShip(the_ship, the_map, command_buffer):
     command_buffer.append(the_ship.stay_still())
 #
 
-def TestMove(the_ship, the_map, the_move, me):
-    global nav_plan
-    #global log_pause
-    
-    new_pos = the_ship.position.directional_offset(the_move)
-    nav_idx = PositionToNavIndex(new_pos, the_map)
-    #if log_pause:
-    #    plan = -1
-    #    if nav_idx in nav_plan:
-    #        plan = nav_plan[nav_idx]
-    #    #
-    #    logging.info("NAV_IDX {} NAV_PLAN {}".format(nav_idx, plan))
+def TestMove(the_ship, the_map, the_move, me, pending):
+    # open if nobody holds the cell, or only a ship that has yet to move this turn
+    nav_idx = ((the_ship.position.x + the_move[0]) % the_map.width) * the_map.width + (the_ship.position.y + the_move[1]) % the_map.height
+    owner = nav_plan[nav_base + nav_idx]
+    return owner < 0 or owner in pending
+#
+
+def PlanPath(the_ship, start_idx, goal_idx, turns_ahead=0):
+    # A* over halite burnt plus time, skipping cells another ship has reserved for the turn we would
+    # get there - this turn's cells are left to ResolveMoves; turns_ahead plans from a later turn
+    best = {start_idx: 0}
+    steps = {start_idx: 0}
+    came_from = {}
+    frontier = [(GetIndexDistance(start_idx, goal_idx) * nav_turn_cost, 0, start_idx)]
+    expanded = 0
+    while frontier:
+        estimate, cost, nav_idx = heappop(frontier)
+        if nav_idx == goal_idx:
+            break
+        #
+        if cost > best[nav_idx]:
+            continue
+        #
+        expanded += 1
+        if expanded > path_search_limit:
+            return [], 0
+        #
+        step = steps[nav_idx] + 1
+        slot = GetNavSlot(step - 1 + turns_ahead) if 1 < step <= nav_horizon - turns_ahead else -1
+        next_cost = cost + halite_grid[nav_idx] // constants.MOVE_COST_RATIO + nav_turn_cost
+        for next_idx in neighbour_index[nav_idx]:
+            if slot >= 0 and nav_plan[slot + next_idx] >= 0 and nav_plan[slot + next_idx] != the_ship.id:
+                continue
+            #
+            if next_cost < best.get(next_idx, next_cost + 1):
+                best[next_idx] = next_cost
+                steps[next_idx] = step
+                came_from[next_idx] = nav_idx
+                dx = abs(torus_dx[(index_x[goal_idx] - index_x[next_idx]) % map_width])
+                dy = abs(torus_dy[(index_y[goal_idx] - index_y[next_idx]) % map_height])
+                heappush(frontier, (next_cost + (dx + dy) * nav_turn_cost + abs(dx - dy) / (2 * map_width), next_cost, next_idx))
+            #
+        #
+    else:
+        return [], 0
     #
-    
-    if nav_idx not in nav_plan:
-        return (the_map[new_pos].is_empty or the_map[new_pos].has_structure or \
-            (the_map[new_pos].is_occupied and the_map[new_pos].ship.owner != me.id))
+    path = [goal_idx]
+    while came_from[path[-1]] != start_idx:
+        path.append(came_from[path[-1]])
     #
-    return False
+    path.reverse()
+    return path, best[goal_idx]
+#
+
+def GetPathCost(start_idx, path):
+    cost = halite_grid[start_idx] // constants.MOVE_COST_RATIO
+    for nav_idx in path[:-1]:
+        cost += halite_grid[nav_idx] // constants.MOVE_COST_RATIO
+    #
+    return cost + len(path) * nav_turn_cost
+#
+
+def GetStepCosts(start_idx, path):
+    # what each step of the path costs at today's halite, GetPathCost one step at a time
+    steps = [start_idx] + path[:-1]
+    return [halite_grid[nav_idx] // constants.MOVE_COST_RATIO + nav_turn_cost for nav_idx in steps]
+#
+
+def ReleasePath(ship_id):
+    # drop the future-turn reservations made for a ship's path
+    for plan_idx in ship_status[ship_id].reserved:
+        if nav_plan[plan_idx] == ship_id:
+            nav_plan[plan_idx] = -1
+        #
+    #
+    ship_status[ship_id].reserved = []
+#
+
+def IsPathOpen(ship_id, path):
+    for turns_ahead, nav_idx in enumerate(path[1:nav_horizon], 1):
+        owner = nav_plan[GetNavSlot(turns_ahead) + nav_idx]
+        if owner >= 0 and owner != ship_id:
+            return False
+        #
+    #
+    return True
+#
+
+def GetShipPath(the_ship, the_map):
+    # keep the cached path while the ship is on it, heading for the same goal, nothing has been
+    # reserved across it and the halite along it has not moved much; otherwise plan again. pathcost
+    # is what the rest of the path cost when it was planned, so a step taken comes off at its planned cost
+    record = ship_status[the_ship.id]
+    start_idx = PositionToNavIndex(the_ship.position, the_map)
+    goal_idx = PositionToNavIndex(record.goal, the_map)
+    path = record.path
+    if path and path[0] == start_idx:
+        path.pop(0)
+        record.pathcost -= record.pathsteps.pop(0)
+    #
+    ReleasePath(the_ship.id)
+    valid = path and record.pathgoal == goal_idx and start_idx in neighbour_index[path[0]] and IsPathOpen(the_ship.id, path)
+    if valid and abs(GetPathCost(start_idx, path) - record.pathcost) > record.pathcost * path_replan_ratio:
+        valid = False
+    #
+    if not valid:
+        # the planner's path from here, if it was planned toward this goal and is still open
+        path = []
+        steps = []
+        spec = spec_paths.pop(the_ship.id, None)
+        if spec and spec[0] == start_idx and spec[1] == goal_idx and IsPathOpen(the_ship.id, spec[2]):
+            path, steps = spec[2], spec[3]
+            if metrics_file:
+                metrics_counts['planned'] = metrics_counts.get('planned', 0) + 1
+            #
+        elif not IsOverBudget():
+            path = PlanPath(the_ship, start_idx, goal_idx)[0]
+            steps = GetStepCosts(start_idx, path)
+        #
+        record.path = path
+        record.pathgoal = goal_idx
+        record.pathsteps = steps
+        record.pathcost = sum(steps)
+    #
+    for turns_ahead, nav_idx in enumerate(path[1:nav_horizon], 1):
+        plan_idx = GetNavSlot(turns_ahead) + nav_idx
+        if nav_plan[plan_idx] < 0:
+            nav_plan[plan_idx] = the_ship.id
+            record.reserved.append(plan_idx)
+        #
+    #
+    return path
 #
 
 def GetNextMove(the_ship, the_map, me):
     global ship_status
-    global testmove_dir_list
-    
-    #return the_map.naive_navigate(the_ship, ship_status[the_ship.id][shipInfo.GOAL])
     
     # Already there - PAUSE
-    if ship_status[the_ship.id][shipInfo.GOAL] == the_ship.position:
-        #logging.info("HUH!! Ship {} State {} Cur {}".format(the_ship.id, ship_status[the_ship.id][shipInfo.STATE], the_ship.position))
+    if ship_status[the_ship.id].goal == the_ship.position:
         return hlt.Direction.Still
     #
     
-    # Find the Delta
-    delta_pos = ship_status[the_ship.id][shipInfo.GOAL] - the_ship.position
-    
-    # Fix X for Torus
-    if abs(delta_pos.x) > the_map.width / 2:
-        if delta_pos.x < 0:
-            delta_pos.x = 1 + the_map.width - abs(delta_pos.x)
-        else:
-            delta_pos.x = abs(delta_pos.x) - the_map.width - 1
-        #
+    # Ships heading home read the storage's flow field
+    goal_idx = PositionToNavIndex(ship_status[the_ship.id].goal, the_map)
+    if storage_distance[goal_idx] == 0 and ship_status[the_ship.id].state in (shipState.RETURNING, shipState.HOMING):
+        ReleasePath(the_ship.id)
+        next_idx = storage_flow[storage_owner[goal_idx]][PositionToNavIndex(the_ship.position, the_map)]
+        return torus_dx[(index_x[next_idx] - the_ship.position.x) % map_width], torus_dy[(index_y[next_idx] - the_ship.position.y) % map_height]
     #
     
-    # Fix Y for Torus
-    if abs(delta_pos.y) > the_map.height / 2:
-        if delta_pos.y < 0:
-            delta_pos.y = 1 + the_map.height - abs(delta_pos.y)
-        else:
-            delta_pos.y = abs(delta_pos.y) - the_map.height - 1
-        #
+    # Follow the planned path when there is one
+    path = GetShipPath(the_ship, the_map)
+    if path:
+        return torus_dx[(index_x[path[0]] - the_ship.position.x) % map_width], torus_dy[(index_y[path[0]] - the_ship.position.y) % map_height]
     #
-    #logging.info("Delta {}".format(delta_pos))
+    
+    # Find the shortest wrapped delta
+    dx, dy = GetDelta(the_ship.position, ship_status[the_ship.id].goal)
         
     # Pick a starting direction
-    if abs(delta_pos.x) > abs(delta_pos.y):
-        move = (int(delta_pos.x/abs(delta_pos.x)),0)
-    elif abs(delta_pos.x) < abs(delta_pos.y):
-        move = (0, int(delta_pos.y/abs(delta_pos.y)))
+    if abs(dx) > abs(dy):
+        move = (int(dx/abs(dx)),0)
+    elif abs(dx) < abs(dy):
+        move = (0, int(dy/abs(dy)))
     else:
-        if random.randint(0,100) > 50:
-            move = (int(delta_pos.x/abs(delta_pos.x)),0)
+        if tiebreak.randint(0,100) > 50:
+            move = (int(dx/abs(dx)),0)
         else:
-            move = (0, int(delta_pos.y/abs(delta_pos.y)))
-        #
-    #
-    
-    # Spin the wheel and find a move!!
-    for cardinal in testmove_dir_list[move]:
-        if TestMove(the_ship, the_map, cardinal, me):
-            return cardinal
+            move = (0, int(dy/abs(dy)))
         #
     #
     
-    # Failed to find a move - Pause
-    return hlt.Direction.Still
+    return move
 #
 
-def NavigateShip(the_ship, the_map, me, command_buffer):
+def QueueMoves(the_ship, options, move_requests):
     global ship_status
-    global verbose
-	
-    #if verbose:
-    #    logging.info("Ship {} Navigating".format(the_ship.id))
-	#
-	
+    
+    # ResolveMoves settles the queue; staying put is the implicit last option
+    move_requests.append((the_ship, options))
+    ship_status[the_ship.id].turntaken = True
+#
+
+def NavigateShip(the_ship, the_map, me, move_requests):
     move = GetNextMove(the_ship, the_map, me)
-    #if verbose:
-    #    logging.info("Ship {} Current {} Goal {} Move {}".format(the_ship.id, the_ship.position, ship_status[the_ship.id][shipInfo.GOAL], move))
+    if move == hlt.Direction.Still:
+        QueueMoves(the_ship, [], move_requests)
+    elif the_ship.halite_amount >= constants.MAX_HALITE * threat_cargo_ratio and enemy_zone_bits:
+        # a loaded ship tries every step away from enemy reach before one next to an enemy
+        x = the_ship.position.x
+        y = the_ship.position.y
+        options = sorted(testmove_dir_list[move], key=lambda option:
+            (enemy_zone_bits >> (((x + option[0]) % the_map.width) * the_map.width + (y + option[1]) % the_map.height)) & 1)
+        QueueMoves(the_ship, options, move_requests)
+    else:
+        QueueMoves(the_ship, testmove_dir_list[move], move_requests)
+    #
+#
+
+def ResolveMoves(move_requests, the_map, me, command_buffer):
+    # settle every queued move together - a ship may take a cell another queued ship is leaving,
+    # which covers chains and two-ship swaps; earlier requests win contested cells
+    pending = {}
+    for priority, (the_ship, options) in enumerate(move_requests):
+        pending[the_ship.id] = [the_ship, options, 0, priority]
+    #
+    moves = {}
+    while pending:
+        if IsOverBudget():
+            # out of time - one greedy pass that treats every held cell as taken
+            taken = set()
+            for entry in sorted(pending.values(), key=lambda entry: entry[3]):
+                the_ship, options = entry[0], entry[1]
+                moves[the_ship.id] = hlt.Direction.Still
+                for move in options[entry[2]:]:
+                    target = PositionToNavIndex(the_ship.position.directional_offset(move), the_map)
+                    if nav_plan[nav_base + target] < 0 and target not in taken:
+                        moves[the_ship.id] = move
+                        taken.add(target)
+                        break
+                    #
+                #
+            #
+            break
+        #
+        claims = {}
+        settled = True
+        for ship_id, entry in list(pending.items()):
+            the_ship, options, choice, priority = entry
+            while choice < len(options) and not TestMove(the_ship, the_map, options[choice], me, pending):
+                choice += 1
+            #
+            entry[2] = choice
+            if choice == len(options):
+                # nowhere to go - it keeps its cell, so anyone counting on it leaving must look again
+                moves[ship_id] = hlt.Direction.Still
+                del pending[ship_id]
+                settled = False
+                continue
+            #
+            target = PositionToNavIndex(the_ship.position.directional_offset(options[choice]), the_map)
+            claims.setdefault(target, []).append(entry)
+        #
+        if not settled:
+            continue
+        #
+        for claimants in claims.values():
+            if len(claimants) > 1:
+                claimants.sort(key=lambda entry: entry[3])
+                for entry in claimants[1:]:
+                    entry[2] += 1
+                #
+                settled = False
+            #
+        #
+        if settled:
+            for ship_id, entry in pending.items():
+                moves[ship_id] = entry[1][entry[2]]
+            #
+            pending.clear()
+        #
     #
     
-    # compute new postion
-    newpos = the_ship.position.directional_offset(move)
-    #if True:
-    #    logging.info("Cr {} Gl {} Mv {} Nx {}".format(the_ship.position, ship_status[the_ship.id][shipInfo.GOAL], move, newpos))
+    cost = 0
+    moved = set()
+    for the_ship, options in move_requests:
+        move = moves[the_ship.id]
+        if move == hlt.Direction.Still:
+            PauseShip(the_ship, the_map, command_buffer)
+        else:
+            UpdateNavPlan(the_ship, the_map, the_ship.position.directional_offset(move))
+            command_buffer.append(the_ship.move(move))
+            cost += int(the_map[the_ship.position].halite_amount * 0.1)
+            moved.add(the_ship.id)
+        #
     #
+    if metrics_file:
+        # stalls wanted to move but had to stay, swaps are pairs that traded cells
+        origins = {PositionToNavIndex(the_ship.position, the_map): the_ship.id for the_ship, options in move_requests}
+        stalls = 0
+        swaps = 0
+        for the_ship, options in move_requests:
+            if options and the_ship.id not in moved:
+                stalls += 1
+            elif the_ship.id in moved:
+                other = origins.get(PositionToNavIndex(the_ship.position.directional_offset(moves[the_ship.id]), the_map))
+                if other in moved and moves[other] == hlt.Direction.invert(moves[the_ship.id]):
+                    swaps += 1
+                #
+            #
+        #
+        metrics_counts['stalls'] = stalls
+        metrics_counts['swaps'] = swaps // 2
+    #
+    return cost, moved
+#
+
+def StartPlanner(game):
+    global planner_thread
+    global spec_storage
+    global spec_flow
+    global spec_sites
+    global spec_paths
     
-    if newpos == the_ship.position:
-        # Pause if nowhere to go
-        PauseShip(the_ship, the_map, command_buffer)
-        return False, 0
-    else:   
-        UpdateNavPlan(the_ship, the_map, newpos)
-    	
-        # add the command
-        command_buffer.append(the_ship.move(move))
-        
-        #if log_nav:
-        #    logging.info("Ship {} Move {}".format(the_ship.id, move))
+    # the thread only reads the module tables, which nothing touches until the next frame, and
+    # the plain values copied here - ReadFrame rewrites the hlt objects under it
+    me = game.me
+    the_map = game.game_map
+    spec_storage = None
+    spec_flow = {}
+    spec_sites = None
+    spec_paths = {}
+    
+    # where each of our ships ends this turn, read back from this turn's reservations
+    ends = {}
+    for nav_idx, owner in enumerate(nav_plan[nav_base:nav_base+nav_area]):
+        if owner >= 0:
+            ends[owner] = nav_idx
+        #
+    #
+    # a converting ship no longer in planned_dropoffs sent make_dropoff this turn
+    converted = [ship_id for ship_id in ends
+        if ship_status[ship_id].state == shipState.CONVERTING and ship_id not in planned_dropoffs]
+    converting = [PositionToNavIndex(ship_status[ship_id].goal, the_map) for ship_id in converted]
+    
+    # ships that will want a path next turn - not there yet, not homing on a flow field and not
+    # able to carry on along the path they have
+    paths = []
+    for the_ship in me.get_ships():
+        record = ship_status.get(the_ship.id)
+        end_idx = ends.get(the_ship.id)
+        if record is None or end_idx is None or record.goal is None or the_ship.id in converted:
+            continue
         #
+        goal_idx = PositionToNavIndex(record.goal, the_map)
+        if goal_idx == end_idx or \
+            (storage_distance[goal_idx] == 0 and record.state in (shipState.RETURNING, shipState.HOMING)) or \
+            (record.path and record.pathgoal == goal_idx and (record.path[0] == end_idx or end_idx in neighbour_index[record.path[0]])):
+            continue
+        #
+        paths.append((the_ship, end_idx, goal_idx))
     #
+    rescore = not converting and len(me.get_dropoffs()) + len(planned_dropoffs) < max_dropoffs and \
+        game.turn_number + 1 - dropoff_sites_turn >= dropoff_refresh
+    planned = sorted(PositionToNavIndex(position, the_map) for position in planned_dropoffs.values())
     
-    # return cost to move
-    return True, int(the_map[the_ship.position].halite_amount * 0.1)
+    planner_stop.clear()
+    args = (me.id, converting[:1], paths, rescore, planned, the_map)
+    if planner_sync:
+        RunPlanner(*args)
+        return
+    #
+    planner_thread = threading.Thread(target=RunPlanner, args=args)
+    planner_thread.daemon = True
+    planner_thread.start()
 #
 
+def RunPlanner(my_id, converting, paths, rescore, planned, the_map):
+    global spec_storage
+    global spec_sites
+    
+    # cheapest first, each result published whole, so whatever is done when the frame lands is usable
+    for storage_idx in converting:
+        distance, owner = MergeStorage(storage_idx, the_map)
+        spec_storage = (storage_idx, len(storage_positions), distance, owner)
+    #
+    for the_ship, end_idx, goal_idx in paths:
+        if planner_stop.is_set():
+            return
+        #
+        path = PlanPath(the_ship, end_idx, goal_idx, 1)[0]
+        if path:
+            spec_paths[the_ship.id] = (end_idx, goal_idx, path, GetStepCosts(end_idx, path))
+        #
+    #
+    targets = converting[:]
+    if abs(halite_total - flow_halite) > flow_halite * flow_rebuild_ratio * planner_flow_ratio:
+        targets += list(storage_positions)
+    #
+    for target in targets:
+        if planner_stop.is_set():
+            return
+        #
+        spec_flow[target] = BuildFlowField(target, the_map)
+    #
+    if rescore and not planner_stop.is_set():
+        spec_sites = (len(storage_positions), planned, ScoreDropoffSites(my_id, planned, the_map))
+    #
+#
 
-# This game object contains the initial game state 
-game = hlt.Game()
-# Respond with your name.
-game.ready("DeepCv18")
+def StopPlanner():
+    global planner_thread
+    
+    if planner_thread is not None:
+        planner_stop.set()
+        planner_thread.join()
+        planner_thread = None
+    #
+#
+
+def AdoptPlan(the_map, turn_number):
+    global flow_halite
+    global dropoff_sites
+    global dropoff_sites_turn
+    global dropoff_sites_storage
+    global spec_flow
+    global spec_sites
+    
+    # flow fields built off last turn's halite only stand in for the ones UpdateFlowFields would build
+    # this turn - all of them once the halite has drifted past flow_rebuild_ratio, otherwise new storages'
+    if abs(halite_total - flow_halite) > flow_halite * flow_rebuild_ratio:
+        if all(storage_idx in spec_flow for storage_idx in storage_positions):
+            flow_halite = halite_total
+            storage_flow.clear()
+            storage_flow.update((storage_idx, spec_flow[storage_idx]) for storage_idx in storage_positions)
+        #
+    else:
+        for storage_idx in storage_positions:
+            if storage_idx not in storage_flow and storage_idx in spec_flow:
+                storage_flow[storage_idx] = spec_flow[storage_idx]
+            #
+        #
+    #
+    planned = sorted(PositionToNavIndex(position, the_map) for position in planned_dropoffs.values())
+    if spec_sites and spec_sites[0] == len(storage_positions) and spec_sites[1] == planned:
+        dropoff_sites = spec_sites[2]
+        dropoff_sites_turn = turn_number
+        dropoff_sites_storage = len(storage_positions)
+    #
+    spec_flow = {}
+    spec_sites = None
+#
 
-shipfibratio = sizeratio2[game.game_map.height][len(game.players)][0]
-max_dropoffs = sizeratio2[game.game_map.height][len(game.players)][1]
-end_ship_create = sizeratio2[game.game_map.height][len(game.players)][2]
-map_width = game.game_map.width
-map_height = game.game_map.height
+def Initialize(game):
+    global shipfibratio
+    global max_dropoffs
+    global end_ship_create
+    global map_width
+    global map_height
+    
+    shipfibratio = sizeratio2[game.game_map.height][len(game.players)][0]
+    max_dropoffs = sizeratio2[game.game_map.height][len(game.players)][1]
+    end_ship_create = sizeratio2[game.game_map.height][len(game.players)][2]
+    map_width = game.game_map.width
+    map_height = game.game_map.height
 
-num_samples = 0
-log_dropoffs = False
-for r in range(0, map_width, int(map_width/8)):
-    for c in range(0, map_height, int(map_height/8)):
-        cur_pos = hlt.Position(r,c)
-        average_halite_ratio += GetHaliteRichness(cur_pos, 4, game.game_map)
-        num_samples += 1
+    # everything that only depends on the map is built here, in the initialization window before
+    # game.ready; the optional stages stop at init_budget and are filled in lazily by the turns
+    started = time.time()
+    BuildTorusTables(map_width, map_height)
+    ResetNavPlan(game.game_map)
+    UpdateGridSnapshot(game)
+    UpdateStorageField(game.me, game.game_map)
+    GetRingOffsets(explore_radius+1)
+    BuildMiningRates()
+    if time.time() - started < init_budget:
+        UpdateFlowFields(game.game_map)
+    #
+    if time.time() - started < init_budget:
+        UpdateDropoffSites(game.me, game.game_map, game.turn_number)
     #
 #
-#logging.info("sum {} num {} avg {}".format(average_halite_ratio, num_samples, average_halite_ratio/num_samples))
-average_halite_ratio /= num_samples
-log_dropoffs = False
 
-while True:
+def PlayTurn(game):
+    global reservedfordropoff
+    global createshipturn
+    global homing_begun
+    
     # Get the latest game state.
-    game.update_frame()
+    if isinstance(game, hlt.Game):
+        ReadFrame(game)
+    else:
+        game.update_frame()
+    #
+    StartTurnClock()
+    StartPhase('prepass')
+    # waiting for the planner to stop counts against the turn
+    StopPlanner()
     # You extract player metadata and the updated map metadata here for convenience.
     me = game.me
     game_map = game.game_map
+    UpdateGridSnapshot(game)
+    UpdateStorageField(me, game_map)
+    PruneShipStatus(me)
+    AdoptPlan(game_map, game.turn_number)
+    UpdateFlowFields(game_map)
+    UpdateDropoffSites(me, game_map, game.turn_number)
+    ScheduleHoming(me.get_ships(), game_map, game.turn_number)
     
-    # clear the nav_plan for the turn
-    nav_plan.clear()
+    # roll the nav_plan forward to this turn
+    RollNavPlan(game.turn_number)
 
     # setup parameters for this turn    
-    extractionratio = 25 + (int(game.turn_number/100) * 5)
-    min_halite = constants.MAX_HALITE / extractionratio
-    return_threshold = int(constants.MAX_HALITE * 0.5) #int(constants.MAX_HALITE * (0.5-(0.25*game.turn_number/constants.MAX_TURNS)))
+    return_threshold = int(constants.MAX_HALITE * return_ratio) #int(constants.MAX_HALITE * (0.5-(0.25*game.turn_number/constants.MAX_TURNS)))
     
     # A command queue holds all the commands you will run this turn.
     command_queue = []
@@ -501,78 +1805,54 @@ while True:
     exploring = 0
     returning = 0
     av_storage_dist = 0
-    #if verbose:
-    #    logging.info("PRE-PASS")
-    #
     for ship in me.get_ships():
         BlockNavIndex(ship, ship.position, game_map)
         if ship.id not in ship_status:
-            ship_status[ship.id] = [shipState.RETURNING, ship.position, ship.position, False, 0, False]
-            #if verbose:
-            #    logging.info("New Ship {}".format(ship.id))
-            #
-        elif ship_status[ship.id][shipInfo.STATE] == shipState.RETURNING:
-            #if verbose:
-            #    logging.info("Ship {} RETURNING".format(ship.id))
-            #
-            if ship.position == ship_status[ship.id][shipInfo.LASTPOS] and not ship_status[ship.id][shipInfo.PAUSE]: 
-                ship_status[ship.id][shipInfo.GOAL] = GetRichestPosition(ship.position, 0, True, False, game_map)
-                #if verbose:
-                #    logging.info("Ship {} didn't move last frame".format(ship.id))
-                #
+            ship_status[ship.id] = shipRecord(shipState.RETURNING, ship.position)
+        elif ship_status[ship.id].state == shipState.RETURNING:
+            if ship.position == ship_status[ship.id].lastpos and not ship_status[ship.id].pause: 
+                ship_status[ship.id].goal = GetRichestPosition(ship.position, 0, True, False, game_map)
             #
-            ship_status[ship.id][shipInfo.PAUSE] = not ship_status[ship.id][shipInfo.PAUSE]
+            ship_status[ship.id].pause = not ship_status[ship.id].pause
             returning += 1
             #
-        elif ship_status[ship.id][shipInfo.STATE] == shipState.EXPLORING:
-            #if verbose:
-            #    logging.info("Ship {} EXPLORING".format(ship.id))
-            #
-            dropoffid = IsOnAnyDropoff(ship, me)
+        elif ship_status[ship.id].state == shipState.EXPLORING:
+            dropoffid = IsOnAnyDropoff(ship, game_map)
             if dropoffid >= 0:
-                ship_status[ship.id][shipInfo.STATE] = shipState.RETURNING
-                ship_status[ship.id][shipInfo.GOAL] = ship.position
-                ship_status[ship.id][shipInfo.DROPID] = dropoffid
-                ship_status[ship.id][shipInfo.LASTPOS] = ship.position
+                ship_status[ship.id].state = shipState.RETURNING
+                ship_status[ship.id].goal = ship.position
+                ship_status[ship.id].dropid = dropoffid
+                ship_status[ship.id].lastpos = ship.position
                 returning += 1
             else:
                 exploring += 1
-                #if ship.position == ship_status[ship.id][shipInfo.LASTPOS] and not ship_status[ship.id][shipInfo.PAUSE]:
-                    #ship_status[ship.id][shipInfo.GOAL] = GetRichestPosition(ship.position, 0, True, False, game_map)
-                    #if verbose:
-                    #    logging.info("Ship {} didn't move last frame".format(ship.id))
-                    #
+                #if ship.position == ship_status[ship.id].lastpos and not ship_status[ship.id].pause:
+                    #ship_status[ship.id].goal = GetRichestPosition(ship.position, 0, True, False, game_map)
                 #
-                closest, index = GetClosestStoragePosition(ship.position, me, game_map)
-                av_storage_dist += game_map.calculate_distance(ship.position, closest)
-            #
-            ship_status[ship.id][shipInfo.PAUSE] = False
-        #
-        if ship_status[ship.id][shipInfo.STATE] != shipState.HOMING:
-            turns_left = constants.MAX_TURNS - game.turn_number
-            if turns_left < 100:
-                storage, id = GetClosestStoragePosition(ship.position, me, game_map)
-                distance = game_map.calculate_distance(ship.position, storage)
-                if (distance * 2.5) > turns_left:
-                    if ship_status[ship.id][shipInfo.STATE] == shipState.EXPLORING:
-                        exploring -= 1
-                    elif ship_status[ship.id][shipInfo.STATE] == shipState.RETURNING:
-                        returning -= 1
-                    elif ship_status[ship.id][shipInfo.STATE] == shipState.CONVERTING:
-                        reservedfordropoff -= int(constants.DROPOFF_COST * dropoffcostoverhead)
-                    #
-                    ship_status[ship.id][shipInfo.STATE] = shipState.HOMING
-                    ship_status[ship.id][shipInfo.GOAL] = storage
-                    homing_begun = True
-                    #logging.info("Ship {} HOMING Distance {}".format(ship.id, distance))
+                av_storage_dist += GetStorageDistance(ship.position, game_map)
+            #
+            ship_status[ship.id].pause = False
+        #
+        if ship_status[ship.id].state != shipState.HOMING and ship_status[ship.id].arrival is not None:
+            # home to the storage the arrival was booked at, even if another is nearer by now
+            storage_idx, slot = ship_status[ship.id].arrival
+            if game.turn_number + GetIndexDistance(PositionToNavIndex(ship.position, game_map), storage_idx) * homing_pace >= slot:
+                if ship_status[ship.id].state == shipState.EXPLORING:
+                    exploring -= 1
+                elif ship_status[ship.id].state == shipState.RETURNING:
+                    returning -= 1
+                elif ship_status[ship.id].state == shipState.CONVERTING:
+                    CancelDropoff(ship.id)
                 #
+                ship_status[ship.id].state = shipState.HOMING
+                ship_status[ship.id].dropid = storage_idx
+                ship_status[ship.id].goal = storage_positions[storage_idx]
+                homing_begun = True
             #
         #
-        #logging.info("Ship {} state {} goal {} pos {} halite {}.".format(ship.id, str(ship_status[ship.id][shipInfo.STATE]), ship_status[ship.id][shipInfo.GOAL], ship.position, ship.halite_amount))
-        ship_status[ship.id][shipInfo.LASTPOS] = ship.position
-        ship_status[ship.id][shipInfo.TURNTAKEN] = False
+        ship_status[ship.id].lastpos = ship.position
+        ship_status[ship.id].turntaken = False
     #
-    #logging.info("PrePro Complete")
     if exploring > 0:
         av_storage_dist /= exploring
     #
@@ -580,208 +1860,142 @@ while True:
     costthisturn = 0
     
     ship_near_shipyard = False
+    explore_requests = []
     
-    #if verbose:
-    #    logging.info("MAIN-PASS")
-    #
+    StartPhase('mainpass')
+    staying = GetStayingShips(me.get_ships(), game_map)
     for ship in me.get_ships():
-        if ship.halite_amount < int(game_map[ship.position].halite_amount * 0.15):
+        if ship.halite_amount < game_map[ship.position].halite_amount // constants.MOVE_COST_RATIO:
             PauseShip(ship, game_map, command_queue)
-        elif ship_status[ship.id][shipInfo.STATE] == shipState.RETURNING:
-            #if verbose:
-            #    logging.info("Ship {} RETURNING".format(ship.id))
-            #
-            if ship.position == ship_status[ship.id][shipInfo.GOAL]:
-                ship_status[ship.id][shipInfo.STATE] = shipState.EXPLORING
-                #ship_status[ship.id][shipInfo.GOAL] = GetRichestPosition(ship.position, 1, True, False, game_map)
-                ship_status[ship.id][shipInfo.GOAL] = game_map.normalize(GetRadialExplorePos(ship.position, ship_status[ship.id][shipInfo.DROPID], game_map.width/4))
-                if ship_status[ship.id][shipInfo.DROPID] not in dropoff_status:
-                    dropoff_status[ship_status[ship.id][shipInfo.DROPID]] = [0, None, None]
+        elif ship_status[ship.id].state == shipState.RETURNING:
+            if ship.position == ship_status[ship.id].goal:
+                ship_status[ship.id].state = shipState.EXPLORING
+                #ship_status[ship.id].goal = GetRichestPosition(ship.position, 1, True, False, game_map)
+                ship_status[ship.id].goal = game_map.normalize(GetRadialExplorePos(ship.position, ship_status[ship.id].dropid, game_map.width/4))
+                if ship_status[ship.id].dropid not in dropoff_status:
+                    dropoff_status[ship_status[ship.id].dropid] = dropRecord()
                 #
-                dropoff_status[ship_status[ship.id][shipInfo.DROPID]][dropInfo.SHIP_HERE] = ship.id
-                #if log_here_near:
-                #    logging.info("Ship {} HERE at Dropoff {}".format(ship.id, ship_status[ship.id][shipInfo.DROPID]))
+                dropoff_status[ship_status[ship.id].dropid].ship_here = ship.id
+            elif GetDistance(ship.position, ship_status[ship.id].goal) == 1:
+                if ship_status[ship.id].dropid not in dropoff_status:
+                    dropoff_status[ship_status[ship.id].dropid] = dropRecord()
                 #
-            elif game_map.calculate_distance(ship.position, ship_status[ship.id][shipInfo.GOAL]) == 1:
-                if ship_status[ship.id][shipInfo.DROPID] not in dropoff_status:
-                    dropoff_status[ship_status[ship.id][shipInfo.DROPID]] = [0, None, None]
-                #
-                if dropoff_status[ship_status[ship.id][shipInfo.DROPID]][dropInfo.SHIP_NEAR] == None:
-                    dropoff_status[ship_status[ship.id][shipInfo.DROPID]][dropInfo.SHIP_NEAR] = ship.id
-                    if ship_status[ship.id][shipInfo.DROPID] == 0:
+                if dropoff_status[ship_status[ship.id].dropid].ship_near == None:
+                    dropoff_status[ship_status[ship.id].dropid].ship_near = ship.id
+                    if ship_status[ship.id].dropid == shipyard_idx:
                         ship_near_shipyard = True
                     #
-                    #if log_here_near:
-                    #    logging.info("Ship {} first to arrive NEAR Dropoff {} ".format(ship.id, ship_status[ship.id][shipInfo.DROPID]))
-                    #
                 else:
                     PauseShip(ship, game_map, command_queue)
-                    #if log_here_near:
-                    #    logging.info("Ship {} NEAR Dropoff {}. PAUSED".format(ship.id, ship_status[ship.id][shipInfo.DROPID]))
-                    #
                 #            
             else:
-                if not (game_map[ship.position].halite_amount < int(min_halite/2) or not ship_status[ship.id][shipInfo.PAUSE]):                   
-                    #if verbose:
-                    #    logging.info("Ship {} pausing".format(ship.id))
-                    #
+                if ship.id in staying and ship_status[ship.id].pause:
                     PauseShip(ship, game_map, command_queue)
                 #
             #
-        elif ship_status[ship.id][shipInfo.STATE] == shipState.HOMING:
-            #if verbose:
-            #    logging.info("Ship {} HOMING - crash in".format(ship.id))
-            #
-            if game_map.calculate_distance(ship.position, ship_status[ship.id][shipInfo.GOAL]) == 1:
-                #if verbose:
-                #    logging.info("Ship {} slam home".format(ship.id))
-                #
-                moves = game_map.get_unsafe_moves(ship.position, ship_status[ship.id][shipInfo.GOAL])
+        elif ship_status[ship.id].state == shipState.HOMING:
+            if GetDistance(ship.position, ship_status[ship.id].goal) == 1:
+                moves = game_map.get_unsafe_moves(ship.position, ship_status[ship.id].goal)
                 command_queue.append(ship.move(moves[0]))
-                ship_status[ship.id][shipInfo.TURNTAKEN] = True
-            #
-        elif ship_status[ship.id][shipInfo.STATE] == shipState.CONVERTING:
-            #if verbose:
-            #    logging.info("Ship {} CONVERTING".format(ship.id))
+                ship_status[ship.id].turntaken = True
             #
-            if ship.position == ship_status[ship.id][shipInfo.GOAL]:
-                if game_map[ship.position].structure is not None:
-                    ship_status[ship.id][shipInfo.STATE] = shipState.RETURNING
-                    ship_status[ship.id][shipInfo.GOAL], ship_status[ship.id][shipInfo.DROPID] = GetClosestStoragePosition(ship.position, me, game_map)                
+        elif ship_status[ship.id].state == shipState.CONVERTING:
+            if ship.position == ship_status[ship.id].goal:
+                if (structure_bits >> PositionToNavIndex(ship.position, game_map)) & 1:
+                    CancelDropoff(ship.id)
+                    ship_status[ship.id].state = shipState.RETURNING
+                    ship_status[ship.id].goal, ship_status[ship.id].dropid = GetClosestStoragePosition(ship.position, me, game_map)                
                 elif me.halite_amount - costthisturn > int(constants.DROPOFF_COST * dropoffcostoverhead):
                     command_queue.append(ship.make_dropoff())
                     del planned_dropoffs[ship.id]
                     reservedfordropoff -= int(constants.DROPOFF_COST * dropoffcostoverhead)
                     costthisturn += constants.DROPOFF_COST
-                    ship_status[ship.id][shipInfo.TURNTAKEN] = True
-                    #if verbose:
-                    #    logging.info("Ship {} CONVERTING - convert".format(ship.id))
-                    #
+                    ship_status[ship.id].turntaken = True
                 else:
-                    #if verbose:
-                    #    logging.info("Ship {} CONVERTING - wait".format(ship.id))
-                    #
                     PauseShip(ship, game_map, command_queue)
                 #
             #
-        elif ship_status[ship.id][shipInfo.STATE] == shipState.EXPLORING:
-            #if verbose:
-            #    logging.info("Ship {} EXPLORING".format(ship.id))
-            #
+        elif ship_status[ship.id].state == shipState.EXPLORING:
             if ship.is_full or (ship.halite_amount > return_threshold and returning < numdropoffs+2):
-                #if verbose:
-                #    logging.info("Ship {} EXPLORING - full[enough]".format(ship.id))
-                #
                 convert = False
                 dropoffpos = ship.position
-                if not dropoffthisturn:
+                if not dropoffthisturn and not IsOverBudget():
                     convert, dropoffpos = ConvertToDropoff(ship, me, av_storage_dist, game_map)
                 #
                 if convert:
-                    ship_status[ship.id][shipInfo.STATE] = shipState.CONVERTING
-                    ship_status[ship.id][shipInfo.GOAL] = dropoffpos
+                    ship_status[ship.id].state = shipState.CONVERTING
+                    ship_status[ship.id].goal = dropoffpos
                     reservedfordropoff += int(constants.DROPOFF_COST * dropoffcostoverhead)
                     dropoffthisturn = True
-                    #if verbose:
-                    #    logging.info("Ship {} EXPLORING - switching to CONVERTING".format(ship.id))
-                    #
                 else:
-                    ship_status[ship.id][shipInfo.STATE] = shipState.RETURNING
-                    ship_status[ship.id][shipInfo.GOAL], ship_status[ship.id][shipInfo.DROPID] = GetClosestStoragePosition(ship.position, me, game_map)
-                    #if verbose:
-                    #    logging.info("Ship {} EXPLORING - switching to RETURNING".format(ship.id))
-                    #
+                    ship_status[ship.id].state = shipState.RETURNING
+                    ship_status[ship.id].goal, ship_status[ship.id].dropid = GetClosestStoragePosition(ship.position, me, game_map)
                 #
-            elif ship_status[ship.id][shipInfo.GOAL] is not None:
-                if ship_status[ship.id][shipInfo.GOAL] == ship.position:
-                    ship_status[ship.id][shipInfo.GOAL] = None
+            elif ship.id in staying:
+                PauseShip(ship, game_map, command_queue)
+            elif ship_status[ship.id].goal is not None:
+                if ship_status[ship.id].goal == ship.position:
+                    ship_status[ship.id].goal = None
                     PauseShip(ship, game_map, command_queue)
-                    #if verbose:
-                    #    logging.info("Ship {} EXPLORING - reached goal, pausing".format(ship.id))
-                    #
-                #
-            elif game_map[ship.position].halite_amount < min_halite:
-                ship_status[ship.id][shipInfo.GOAL] = GetRichestPosition(ship.position, 1, game_map[ship.position].halite_amount==0, False, game_map)
-                #if verbose:
-                #    logging.info("Ship {} EXPLORING - emptied cell goal, moving to new goal".format(ship.id))
                 #
             else:
-                PauseShip(ship, game_map, command_queue)
-                #if verbose:
-                #    logging.info("Ship {} EXPLORING - pausing".format(ship.id))
-                #
+                explore_requests.append(ship)
             #
         #
     #
     
+    # hand out new goals to all the ships that emptied their cell
+    AssignExploreGoals(explore_requests, game_map)
+    
+    StartPhase('dropoffs')
+    move_requests = []
+    stall_checks = []
     for id, info in dropoff_status.items():
-        ship_here_id = info[dropInfo.SHIP_HERE]
-        ship_near_id = info[dropInfo.SHIP_NEAR]
-        #if log_here_near:
-        #    logging.info("Dropoff {} Ship Here {} Near {} ".format(id, ship_here_id, ship_near_id))
-        #
+        ship_here_id = info.ship_here
+        ship_near_id = info.ship_near
         if ship_here_id and ship_near_id:
             ship_here = me.get_ship(ship_here_id)
             ship_near = me.get_ship(ship_near_id)
-            to_near = game_map.get_unsafe_moves(ship_here.position, ship_near.position)
-            UpdateNavPlan(ship_here, game_map, ship_near.position)
-            command_queue.append(ship_here.move(to_near[0]))
-            to_here = game_map.get_unsafe_moves(ship_near.position, ship_here.position)
-            UpdateNavPlan(ship_near, game_map, ship_here.position)
-            command_queue.append(ship_near.move(to_here[0]))
-            #if log_here_near:
-            #    logging.info("Ship Here & Near switched")
-            #
+            QueueMoves(ship_here, game_map.get_unsafe_moves(ship_here.position, ship_near.position), move_requests)
+            QueueMoves(ship_near, game_map.get_unsafe_moves(ship_near.position, ship_here.position), move_requests)
         elif ship_here_id:
             ship_here = me.get_ship(ship_here_id)
-            success, cost = NavigateShip(ship_here, game_map, me, command_queue)
-            costthisturn += cost
-            if not success:
-                #if log_here_near:
-                #    logging.info("Ship Here Stalled")
-                #
-                ship_status[ship_here_id][shipInfo.STATE] = shipState.RETURNING
-                ship_status[ship_here_id][shipInfo.GOAL] = ship_here.position
-                ship_status[ship_here_id][shipInfo.PAUSE] = False
-                ship_status[ship_here_id][shipInfo.TURNTAKEN] = True
-            #
+            NavigateShip(ship_here, game_map, me, move_requests)
+            stall_checks.append(ship_here)
         elif ship_near_id:
             ship_near = me.get_ship(ship_near_id)
-            dropoff_cell = game_map[ship_status[ship_near_id][shipInfo.GOAL]]
-            if dropoff_cell.is_occupied and dropoff_cell.ship.owner != me.id:
+            if (enemy_bits >> PositionToNavIndex(ship_status[ship_near_id].goal, game_map)) & 1:
                 # kamikaze dropoff squatter
-                #if log_here_near:
-                #    logging.info("KAMIKAZE: Ship {} Position {} Goal {} Owner {} Me {}".format(ship_near_id, ship_near.position, ship_status[ship_near_id][shipInfo.GOAL], dropoff_cell.ship.owner, me))
-                #
-                to_dropoff = game_map.get_unsafe_moves(ship_near.position, ship_status[ship_near_id][shipInfo.GOAL])
-                UpdateNavPlan(ship_near, game_map, ship_status[ship_near_id][shipInfo.GOAL])
+                to_dropoff = game_map.get_unsafe_moves(ship_near.position, ship_status[ship_near_id].goal)
+                UpdateNavPlan(ship_near, game_map, ship_status[ship_near_id].goal)
                 command_queue.append(ship_near.move(to_dropoff[0]))
             else:
                 # move in carefully
-                success, cost = NavigateShip(ship_near, game_map, me, command_queue)
-                costthisturn += cost
-                #if log_here_near:
-                #    logging.info("Ship Near Moved")
-                #
+                NavigateShip(ship_near, game_map, me, move_requests)
             #
         #
-        info[dropInfo.SHIP_HERE] = None
-        info[dropInfo.SHIP_NEAR] = None
+        info.ship_here = None
+        info.ship_near = None
     #
     
-    #if verbose:
-    #    logging.info("POST-PASS")
-    #
+    StartPhase('navigation')
     for ship in me.get_ships():        
-        if not ship_status[ship.id][shipInfo.TURNTAKEN]:
-            #if log_nav:
-            #    logging.info("Ship {} moving".format(ship.id))
-            #
-            success, cost = NavigateShip(ship, game_map, me, command_queue)
-            costthisturn += cost
+        if not ship_status[ship.id].turntaken:
+            NavigateShip(ship, game_map, me, move_requests)
         #
     #
-       
+    
+    cost, moved = ResolveMoves(move_requests, game_map, me, command_queue)
+    costthisturn += cost
+    for ship_here in stall_checks:
+        if ship_here.id not in moved:
+            ship_status[ship_here.id].state = shipState.RETURNING
+            ship_status[ship_here.id].goal = ship_here.position
+            ship_status[ship_here.id].pause = False
+        #
+    #
+    
+    StartPhase('spawn')
     # If you're on the first turn and have enough halite, spawn a ship.
     # Don't spawn a ship if you currently have a ship at port, though.
     if game.turn_number <= 1 or \
@@ -792,15 +2006,29 @@ while True:
         game_map[me.shipyard].is_occupied) and not ship_near_shipyard:
         command_queue.append(game.me.shipyard.spawn())
         createshipturn = game.turn_number
-        #if verbose:
-        #    logging.info("Create Ship")
-        #
     #
     
+    EmitMetrics(game, command_queue)
     # Send your moves back to the game environment, ending this turn.
     game.end_turn(command_queue)
     
-    #if verbose and game.turn_number == 100:
-    #    break
+    # work ahead while the other players move
+    if planner_enabled and (planner_sync or isinstance(game, hlt.Game)):
+        StartPlanner(game)
+    #
+#
+
+if __name__ == "__main__":
+    # This game object contains the initial game state 
+    game = hlt.Game()
+    if '--metrics' in sys.argv:
+        EnableMetrics("metrics-{}.jsonl".format(game.my_id))
+    #
+    Initialize(game)
+    # Respond with your name.
+    game.ready("DeepCv18")
+    
+    while True:
+        PlayTurn(game)
     #
 #
\ No newline at end of file
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+# Parameter sweep over the bot's tuning globals. Every combination of the --param values plays
+# --games seeded LocalEngine games against the untouched bot, spread over all cores, and the
+# mean final halite of the tuned seat is reported with a 95% confidence interval.
+#
+#   python3 Sweep.py --param return_ratio=0.4,0.5,0.6 --param mining_horizon=4,8,12
+#   python3 Sweep.py --sizes 32 --players 4 --param sizeratio2.32.4.0=0.6,0.75,0.9
+#   python3 Sweep.py --param dropoffcostoverhead=1.0,1.1,1.3 --param ship_cost_divisor=50,100,200
+#
+# A dotted name reaches into a dict global, so sizeratio2.32.4.0 is sizeratio2[32][4][0]. Values
+# are parsed as JSON.
+
+import copy
+import json
+import math
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import LocalEngine
+
+def ParseParam(text):
+    name, values = text.split('=', 1)
+    return name, [json.loads(value) for value in values.split(',')]
+#
+
+def BuildOverrides(bot, config):
+    # turn {'sizeratio2.32.4.0': 0.6, 'return_ratio': 0.4} into whole replacement globals
+    overrides = {}
+    for name, value in config.items():
+        parts = name.split('.')
+        if len(parts) == 1:
+            overrides[name] = value
+            continue
+        #
+        if parts[0] not in overrides:
+            overrides[parts[0]] = copy.deepcopy(getattr(bot, parts[0]))
+        #
+        target = overrides[parts[0]]
+        keys = [int(part) if part.lstrip('-').isdigit() else part for part in parts[1:]]
+        for key in keys[:-1]:
+            target = target[key]
+        #
+        target[keys[-1]] = value
+    #
+    return overrides
+#
+
+def PlayJob(job):
+    # runs in a worker process; the tuned bot sits in seat `seat`, the others are untouched
+    config_id, bot_path, opponent_path, overrides, size, num_players, seed, seat, budget, sync_planner = job
+    paths = [opponent_path] * num_players
+    paths[seat] = bot_path
+    seat_overrides = [None] * num_players
+    seat_overrides[seat] = overrides
+    scores, engine = LocalEngine.PlayGame(paths, size, seed, budget=budget, overrides=seat_overrides, sync_planner=sync_planner)
+    return config_id, scores[seat], scores[seat] == max(scores)
+#
+
+def GetInterval(values):
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, 0
+    #
+    variance = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+    return mean, 1.96 * math.sqrt(variance / len(values))
+#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep the bot's tuning globals over many local games.")
+    parser.add_argument('--param', action='append', default=[], help="name=v1,v2,... - may be repeated")
+    parser.add_argument('--bot', default='MyBot.py')
+    parser.add_argument('--opponent', default=None, help="bot for the other seats, defaults to --bot untouched")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32, 48, 64])
+    parser.add_argument('--players', type=int, nargs='+', default=[2])
+    parser.add_argument('--games', type=int, default=10, help="seeds per size and player count")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="defaults to one per core")
+    parser.add_argument('--budget', type=float, default=100.0, help="turn budget for every bot, high so timing never changes a game")
+    parser.add_argument('--sync-planner', action='store_true', help="run every bot's next-turn planner inline, as it runs live")
+    args = parser.parse_args()
+
+    params = [ParseParam(text) for text in args.param]
+    names = [name for name, values in params]
+    configs = [dict(zip(names, combo)) for combo in itertools.product(*[values for name, values in params])]
+    opponent = args.opponent or args.bot
+    defaults = LocalEngine.LoadBot(args.bot)
+    jobs = []
+    for config_id, config in enumerate(configs):
+        overrides = BuildOverrides(defaults, config)
+        for size in args.sizes:
+            for num_players in args.players:
+                for seed in range(args.seed, args.seed + args.games):
+                    # rotate the tuned seat so no configuration always gets the same corner
+                    jobs.append((config_id, args.bot, opponent, overrides, size, num_players, seed, seed % num_players, args.budget, args.sync_planner))
+                #
+            #
+        #
+    #
+
+    started = time.time()
+    scores = [[] for _ in configs]
+    wins = [0] * len(configs)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for config_id, score, won in executor.map(PlayJob, jobs, chunksize=4):
+            scores[config_id].append(score)
+            wins[config_id] += won
+        #
+    #
+
+    print("{} games in {:.0f}s".format(len(jobs), time.time() - started))
+    ranked = sorted(range(len(configs)), key=lambda config_id: -GetInterval(scores[config_id])[0])
+    for config_id in ranked:
+        mean, interval = GetInterval(scores[config_id])
+        label = ", ".join("{}={}".format(name, json.dumps(value)) for name, value in configs[config_id].items()) or "defaults"
+        print("{:>9.0f} +/- {:<7.0f} wins {:>3}/{:<3} {}".format(mean, interval, wins[config_id], len(scores[config_id]), label))
+    #
+#